@@ -1 +1,6 @@
-__all__ = ['cards', 'game', 'player', 'miscellaneous']
+__all__ = [
+    'cards', 'game', 'player', 'miscellaneous',
+    'rules', 'strategy', 'simulation', 'ev', 'sweep', 'tables',
+    'insurance', 'traces', 'benchmark', 'accounts',
+    'parallel', 'allocations', 'snapshot',
+]
@@ -0,0 +1,230 @@
+"""Accounts module. Large populations of accounts stored as columns."""
+
+
+from array import array
+from collections.abc import MutableSequence
+from operator import add
+
+from blackjackgame.miscellaneous import whole_dollars
+from blackjackgame.player import Player
+
+
+# A hand can only be split once, so an account has at most two wagers
+MAX_BETS = 2
+
+
+class AccountTable:
+    """Accounts kept in parallel arrays indexed by account id.
+
+    Each column is a flat array of whole dollar amounts, so a whole
+    population costs a few machine words per account and bulk updates
+    touch contiguous memory. The bets column holds MAX_BETS wagers per
+    account, of which the bet counts column says how many are placed.
+    """
+
+    def __init__(self):
+        """Class constructor. Starts with no accounts."""
+        self._names = []
+        self._ids = {}
+        self._balances = array('q')
+        self._bets = array('q')
+        self._bet_counts = array('B')
+        self._rounds = array('q')
+        self._wagered = array('q')
+
+    def __len__(self):
+        """Override len method to return number of accounts."""
+        return len(self._names)
+
+    def __contains__(self, name):
+        """Check if an account exists for a name."""
+        return name in self._ids
+
+    @property
+    def names(self):
+        """Getter for account names, indexed by account id."""
+        return self._names
+
+    @property
+    def balances(self):
+        """Getter for the balance column."""
+        return self._balances
+
+    @property
+    def bets(self):
+        """Getter for the bets column, MAX_BETS entries per account."""
+        return self._bets
+
+    @property
+    def bet_counts(self):
+        """Getter for the column of wagers placed this round."""
+        return self._bet_counts
+
+    @property
+    def rounds(self):
+        """Getter for the column of rounds played."""
+        return self._rounds
+
+    @property
+    def wagered(self):
+        """Getter for the column of total amounts wagered."""
+        return self._wagered
+
+    def open(self, name, bankroll=10000):
+        """Create an account and return its id."""
+        if name in self._ids:
+            raise ValueError(f"An account named {name} already exists.")
+        account_id = len(self._names)
+        self._names.append(name)
+        self._ids[name] = account_id
+        self._balances.append(whole_dollars(bankroll))
+        self._bets.extend([0] * MAX_BETS)
+        self._bet_counts.append(0)
+        self._rounds.append(0)
+        self._wagered.append(0)
+        return account_id
+
+    def account_id(self, name):
+        """Id of the account with a name."""
+        return self._ids[name]
+
+    def player(self, name):
+        """Seat the account with a name as a player."""
+        return AccountPlayer(self, self._ids[name])
+
+    def adjust(self, account_ids, amounts):
+        """Add an amount to the balance of each account."""
+        balances = self._balances
+        for account_id, amount in zip(account_ids, amounts):
+            balances[account_id] += whole_dollars(amount)
+
+    def adjust_all(self, amounts):
+        """Add an amount to every balance, amounts indexed by account id.
+
+        The column is updated in place, so views of it stay current.
+        """
+        if len(amounts) != len(self._balances):
+            raise ValueError("An amount is needed for every account.")
+        self._balances[:] = array(
+            'q', map(add, self._balances, map(whole_dollars, amounts))
+        )
+
+    def record_round(self, account_id, wagered):
+        """Add a round and the amount wagered in it to the statistics."""
+        self._rounds[account_id] += 1
+        self._wagered[account_id] += whole_dollars(wagered)
+
+
+class AccountBets(MutableSequence):
+    """List of an account's wagers, stored in the table's bets column."""
+
+    __slots__ = ('_accounts', '_account_id')
+
+    def __init__(self, accounts, account_id):
+        """Constructor. Views the wagers of an existing account."""
+        self._accounts = accounts
+        self._account_id = account_id
+
+    def __repr__(self):
+        """Override AccountBets repr method to look like a list."""
+        return repr(list(self))
+
+    def __len__(self):
+        """Override len method to return number of wagers placed."""
+        return self._accounts.bet_counts[self._account_id]
+
+    def _position(self, index):
+        """Position in the bets column of a wager."""
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("bet index out of range")
+        return self._account_id * MAX_BETS + index
+
+    def __getitem__(self, index):
+        """Wager at an index, or a list of wagers for a slice."""
+        if isinstance(index, slice):
+            start = self._account_id * MAX_BETS
+            return self._accounts.bets[start:start + len(self)].tolist()[
+                index
+            ]
+        return self._accounts.bets[self._position(index)]
+
+    def __setitem__(self, index, amount):
+        """Replace the wager at an index."""
+        self._accounts.bets[self._position(index)] = whole_dollars(amount)
+
+    def __delitem__(self, index):
+        """Remove the wager at an index."""
+        bets = self[:]
+        del bets[index]
+        self.clear()
+        self.extend(bets)
+
+    def insert(self, index, amount):
+        """Place a wager before an index."""
+        bets = self[:]
+        bets.insert(index, whole_dollars(amount))
+        if len(bets) > MAX_BETS:
+            raise ValueError(f"An account has at most {MAX_BETS} wagers.")
+        start = self._account_id * MAX_BETS
+        self._accounts.bets[start:start + len(bets)] = array('q', bets)
+        self._accounts.bet_counts[self._account_id] = len(bets)
+
+    def clear(self):
+        """Remove every wager."""
+        self._accounts.bet_counts[self._account_id] = 0
+
+
+class AccountPlayer(Player):
+    """Player whose balance, bets and statistics live in an AccountTable."""
+
+    __slots__ = ('_accounts', '_account_id')
+
+    def __init__(self, accounts, account_id):
+        """Constructor. Seats an existing account."""
+        super().__init__(accounts.names[account_id], 0)
+        self._accounts = accounts
+        self._account_id = account_id
+        self._bet = AccountBets(accounts, account_id)
+
+    def __repr__(self):
+        """Override AccountPlayer repr method."""
+        return f"AccountPlayer({self._name}, {self.balance})"
+
+    def __reduce__(self):
+        """Pickle as a plain Player holding the current balance."""
+        return Player, (self._name, self.balance)
+
+    @property
+    def account_id(self):
+        """Getter for account id."""
+        return self._account_id
+
+    @property
+    def balance(self):
+        """Getter for player balance."""
+        return self._accounts.balances[self._account_id]
+
+    @balance.setter
+    def balance(self, balance):
+        """Setter for player balance, in whole dollars."""
+        self._accounts.balances[self._account_id] = whole_dollars(balance)
+
+    @property
+    def bet(self):
+        """Getter for bets, a list-like view of the bets column."""
+        return self._bet
+
+    @bet.setter
+    def bet(self, bet):
+        """Setter for bets, copied into the bets column."""
+        self._bet.clear()
+        self._bet.extend(bet)
+
+    def reset(self):
+        """Record the round's wagers, then reset for a new game."""
+        if self._bet:
+            self._accounts.record_round(self._account_id, sum(self._bet))
+        super().reset()
@@ -0,0 +1,285 @@
+"""Allocations module. Memory allocated by each phase of play.
+
+Run with python -m blackjackgame.allocations to play seeded rounds of
+the simulation and of the terminal game, with bots in every seat, under
+tracemalloc. The exit status is 1 if a round allocates more than its
+budget. With --game the terminal game is played interactively with
+every phase of its loop tracked, and a report is printed at the end.
+"""
+
+
+import argparse
+import sys
+import tracemalloc
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
+from random import Random
+
+from blackjackgame.rules import DEFAULT_RULES
+from blackjackgame.strategy import basic_strategy
+from blackjackgame.simulation import new_shoe, round_results
+from blackjackgame.traces import random_orders
+
+
+# Budgets in bytes per round
+ROUND_PEAK_BUDGET = 4096
+ROUND_RETAINED_BUDGET = 64
+GAME_ROUND_PEAK_BUDGET = 4096
+GAME_ROUND_RETAINED_BUDGET = 64
+
+# BlackjackGame methods tracked in a game, play_round being one round
+GAME_PHASES = (
+    'set_players', 'play_round', 'place_bets', 'deal_all',
+    'prompt_insurance', 'take_turn', 'check_win', 'endgame',
+)
+
+PhaseStats = namedtuple('PhaseStats', ['calls', 'retained', 'peak'])
+PhaseStats.__doc__ = """Memory used by the calls of a phase.
+
+calls -- number of times the phase ran
+retained -- bytes still allocated when each call returned, summed
+peak -- most bytes allocated at once during any call, above its start
+"""
+
+
+class AllocationTracker:
+    """Allocations of named phases, measured with tracemalloc.
+
+    Phases may be nested, the peak of a phase includes the phases run
+    inside it. Tracing is started by using the tracker as a context
+    manager unless it is already running.
+    """
+
+    def __init__(self):
+        """Class constructor. Starts with no phases."""
+        self._stats = {}
+        self._stack = []
+        self._started = False
+
+    def __enter__(self):
+        """Start tracing allocations."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop tracing allocations if this tracker started it."""
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    @property
+    def stats(self):
+        """Getter for phase statistics, keyed by phase name."""
+        return self._stats
+
+    def start(self):
+        """Begin measuring a phase, ended by stop or discard."""
+        # Bookkeeping is allocated before the start is measured, and the
+        # measurements are kept in an array so no int objects are retained
+        frame = array('q', (0, 0))
+        self._stack.append(frame)
+        current, peak = tracemalloc.get_traced_memory()
+        if len(self._stack) > 1:
+            # Resetting the peak below would lose the enclosing phase's
+            self._stack[-2][1] = max(self._stack[-2][1], peak)
+        tracemalloc.reset_peak()
+        frame[0] = frame[1] = current
+
+    def _end(self):
+        """End the phase begun last. Returns its retained and peak bytes."""
+        current, peak = tracemalloc.get_traced_memory()
+        start, frame_peak = self._stack.pop()
+        peak = max(frame_peak, peak)
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        return current - start, peak - start
+
+    def stop(self, name):
+        """End the phase begun last and record it under a name."""
+        # Ended before the call below, whose bound method would be counted
+        retained, peak = self._end()
+        self._record(name, retained, peak)
+
+    def discard(self):
+        """End the phase begun last without recording it."""
+        self._end()
+
+    @contextmanager
+    def phase(self, name):
+        """Measure the allocations of the code run inside a with block."""
+        self.start()
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def _record(self, name, retained, peak):
+        """Add one call of a phase to its statistics."""
+        calls, total, most = self._stats.get(name, (0, 0, 0))
+        self._stats[name] = PhaseStats(
+            calls + 1, total + retained, max(most, peak)
+        )
+
+    def report(self):
+        """Lines describing each phase, averaged per call."""
+        lines = []
+        for name, (calls, retained, peak) in self._stats.items():
+            lines.append(
+                f"{name}: {calls} calls, {retained / calls:.0f} B retained "
+                f"per call, {peak} B peak"
+            )
+        return lines
+
+
+def track_game(game, tracker, phases=GAME_PHASES):
+    """Wrap the phases of a BlackjackGame so that each call is tracked."""
+
+    def tracked(name, method):
+        def wrapper(*args, **kwargs):
+            tracker.start()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                tracker.stop(name)
+
+        return wrapper
+
+    for name in phases:
+        setattr(game, name, tracked(name, getattr(game, name)))
+    return game
+
+
+def simulated_rounds(
+    tracker, rules=DEFAULT_RULES, rounds=10000, seed=None, table=None
+):
+    """Track each of a number of rounds played by the simulation.
+
+    Shoes are built and shuffled outside of the tracked rounds.
+    """
+    rng = Random(seed)
+    if table is None:
+        table = basic_strategy(rules)
+
+    played = 0
+    while played < rounds:
+        results = round_results(new_shoe(rules, rng), rules, table)
+        while played < rounds:
+            tracker.start()
+            net = next(results, None)
+            if net is None:
+                # The shoe ended without another round
+                tracker.discard()
+                break
+            tracker.stop('round')
+            played += 1
+    return tracker
+
+
+class _Discard:
+    """Output stream that drops what is written without buffering it."""
+
+    def write(self, text):
+        """Drop text, reporting it written."""
+        return len(text)
+
+    def flush(self):
+        """Nothing is buffered, so there is nothing to flush."""
+
+
+def scripted_game_rounds(
+    tracker, rules=DEFAULT_RULES, rounds=1000, seed=None, num_bots=4
+):
+    """Track each of a number of rounds of the terminal game, bots only.
+
+    Every step of a round but asking to play again is played, then the
+    table is reset as if everyone said yes. Output is thrown away without
+    the typing effect, and shoes are built outside of the tracked rounds.
+    Dealing shrinks the shoe, so a round may retain fewer than 0 bytes.
+    """
+    # Imported here so that simulation budget checks do not load the game
+    from contextlib import redirect_stdout
+    from blackjackgame.game import BlackjackGame, ROUND_STEPS
+    from blackjackgame.miscellaneous import set_typing_effect
+    from blackjackgame.player import BotPlayer
+
+    table = basic_strategy(rules)
+    bots = [BotPlayer(f"Bot {i + 1}", table) for i in range(num_bots)]
+    # Every round uses a few cards at least, so shoes never run out
+    shoes = random_orders(rounds, rules.num_decks, seed)
+    steps = ROUND_STEPS[:-1]
+    set_typing_effect(False)
+    try:
+        with redirect_stdout(_Discard()):
+            game = BlackjackGame(rules, bots, shoes, welcome=False)
+            game.seat_bots()
+            for _ in range(rounds):
+                # Builds the next shoe once the last reached its cut card
+                game.deck
+                tracker.start()
+                for step in steps:
+                    getattr(game, step)()
+                game.reset_values()
+                tracker.stop('game round')
+    finally:
+        set_typing_effect(True)
+    return tracker
+
+
+def play_tracked_game(tracker):
+    """Play the terminal game with every phase tracked."""
+    # Imported here so that budget checks do not load the game
+    from blackjackgame.game import BlackjackGame
+
+    game = track_game(BlackjackGame(), tracker)
+    game.run()
+    return tracker
+
+
+def main(argv=None):
+    """Measure allocations per round and compare them with their budgets."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=10000)
+    parser.add_argument('--game-rounds', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--game', action='store_true')
+    args = parser.parse_args(argv)
+
+    with AllocationTracker() as tracker:
+        if args.game:
+            play_tracked_game(tracker)
+        else:
+            simulated_rounds(tracker, rounds=args.rounds, seed=args.seed)
+            scripted_game_rounds(
+                tracker, rounds=args.game_rounds, seed=args.seed
+            )
+    for line in tracker.report():
+        print(line)
+    if args.game:
+        return 0
+
+    results = []
+    budgets = [
+        ('round', ROUND_PEAK_BUDGET, ROUND_RETAINED_BUDGET),
+        ('game round', GAME_ROUND_PEAK_BUDGET, GAME_ROUND_RETAINED_BUDGET),
+    ]
+    for name, peak_budget, retained_budget in budgets:
+        if name not in tracker.stats:
+            continue
+        calls, retained, peak = tracker.stats[name]
+        results.append((f"{name} peak", peak, peak_budget))
+        results.append(
+            (f"{name} retained", retained / calls, retained_budget)
+        )
+    over = False
+    for name, size, budget in results:
+        status = 'ok' if size <= budget else 'OVER BUDGET'
+        over = over or size > budget
+        print(f"{name}: {size:.0f} B (budget {budget} B) {status}")
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
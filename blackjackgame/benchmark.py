@@ -0,0 +1,103 @@
+"""Benchmark module. Measures how long the game takes to start.
+
+Run with python -m blackjackgame.benchmark. The game is launched in a
+scratch directory holding a database of many accounts, and the exit
+status is 1 if a measurement is over its budget.
+"""
+
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from statistics import median
+
+from blackjackgame.player import Player, PlayerStore
+
+
+# Budgets in seconds
+IMPORT_BUDGET = 0.03
+FIRST_PROMPT_BUDGET = 0.15
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAME = os.path.join(ROOT, 'blackjack.py')
+IMPORT = 'import blackjackgame.game'
+
+
+def import_time():
+    """Seconds to import the game module, as reported by -X importtime."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == 'blackjackgame.game':
+            return int(fields[1]) / 1e6
+    raise RuntimeError("Could not find the game module in the import times.")
+
+
+def first_prompt_time(directory):
+    """Seconds from launching the game until the welcome starts printing."""
+    start = time.perf_counter()
+    with subprocess.Popen(
+        [sys.executable, GAME],
+        cwd=directory,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    ) as process:
+        process.stdout.read(1)
+        elapsed = time.perf_counter() - start
+        process.kill()
+    return elapsed
+
+
+def make_database(directory, accounts):
+    """Write a players database with the given number of accounts."""
+    store = PlayerStore(os.path.join(directory, 'players.db'))
+    for i in range(accounts):
+        store.add(Player(f"player{i}"))
+    store.save()
+
+
+def main(argv=None):
+    """Measure startup times and compare them with their budgets."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--accounts', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        make_database(directory, args.accounts)
+        results = [
+            (
+                'import',
+                median(import_time() for _ in range(args.runs)),
+                IMPORT_BUDGET,
+            ),
+            (
+                'first prompt',
+                median(first_prompt_time(directory) for _ in range(args.runs)),
+                FIRST_PROMPT_BUDGET,
+            ),
+        ]
+
+    over = False
+    for name, seconds, budget in results:
+        status = 'ok' if seconds <= budget else 'OVER BUDGET'
+        over = over or seconds > budget
+        print(
+            f"{name}: {seconds * 1000:.1f} ms "
+            f"(budget {budget * 1000:.0f} ms) {status}"
+        )
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -53,9 +53,8 @@ class Deck:
 
     def __init__(self, cut_card_position_min=0, cut_card_position_max=0):
         """Class constructor that initializes deck components."""
-        self._cards = [
-            Card(rank, suit) for suit in self.suits for rank in self.ranks
-        ]
+        # Cards are immutable, so every deck shares the same ones
+        self._cards = list(CARDS)
         if cut_card_position_min == 0 and cut_card_position_max == 0:
             self._cut_card_position = 10
         else:
@@ -63,6 +62,14 @@ class Deck:
                 cut_card_position_min, cut_card_position_max
             )
 
+    @classmethod
+    def from_codes(cls, codes, cut_card_position=10):
+        """Deck in a fixed order given as card codes, without shuffling."""
+        deck = cls()
+        deck._cards = [CARDS[code] for code in codes]
+        deck._cut_card_position = cut_card_position
+        return deck
+
     def __getitem__(self, position):
         """Override getitem method to return card at specific position."""
         return self._cards[position]
@@ -80,6 +87,11 @@ class Deck:
         """Getter for cards."""
         return self._cards
 
+    @property
+    def cut_card_position(self):
+        """Getter for cut card position, counted from the bottom."""
+        return self._cut_card_position
+
     def shuffle(self, num=1):
         """Shuffle deck."""
         for _ in range(num):
@@ -90,8 +102,8 @@ class Deck:
         pos = floor(len(self._cards) * 0.2)
         half = (len(self._cards) // 2) + randrange(-pos, pos)
         tophalf = self._cards[:half]
-        bottomhalf = self._cards[half:]
-        self._cards = bottomhalf + tophalf
+        del self._cards[:half]
+        self._cards += tophalf
 
     def shuffle_and_cut(self):
         """Shuffle and cut deck."""
@@ -100,12 +112,96 @@ class Deck:
 
     def deal(self, num=1):
         """Deal cards to player."""
-        return [self._cards.pop(0) for _ in range(num)]
+        cards = self._cards[:num]
+        del self._cards[:num]
+        return cards
 
     def merge(self, other_deck):
         """Merge deck with another deck."""
-        self._cards = self._cards + other_deck.cards
+        self._cards += other_deck.cards
 
     def needs_shuffling(self):
         """Check if cut card has been reached and deck needs shuffling."""
         return len(self._cards) <= self._cut_card_position
+
+
+# Every card in a single deck, positioned by its code
+CARDS = tuple(Card(rank, suit) for suit in Deck.suits for rank in Deck.ranks)
+CARD_CODES = {card: code for code, card in enumerate(CARDS)}
+# Blackjack value of each card code, for use with bytes.translate
+CODE_VALUES = bytes(map(card_value, CARDS)) + bytes(256 - len(CARDS))
+
+
+def card_code(card):
+    """Code of a card, from 0 to 51."""
+    return CARD_CODES[card]
+
+
+class Composition:
+    """Counts of the cards that have not been seen yet, by value."""
+
+    # Hi-Lo tag for each value, Aces first
+    hi_lo = (-1, 1, 1, 1, 1, 1, 0, 0, 0, -1)
+
+    def __init__(self, num_decks=8):
+        """Class constructor. Starts with every card in the shoe unseen."""
+        self._num_decks = num_decks
+        self.reshuffle()
+
+    @property
+    def counts(self):
+        """Getter for unseen counts, Aces first and ten-valued cards last."""
+        return self._counts
+
+    @property
+    def remaining(self):
+        """Getter for the number of unseen cards."""
+        return self._remaining
+
+    @property
+    def running_count(self):
+        """Getter for the Hi-Lo running count of seen cards."""
+        return self._running_count
+
+    @classmethod
+    def from_values(cls, values):
+        """Composition of a shoe given as a buffer of card values."""
+        composition = cls(len(values) // 52)
+        composition.reshuffle(values)
+        return composition
+
+    @classmethod
+    def from_counts(cls, num_decks, counts, running_count=0):
+        """Composition with given unseen counts, as taken part way through."""
+        composition = cls(num_decks)
+        composition._counts = list(counts)
+        composition._remaining = sum(counts)
+        composition._running_count = running_count
+        return composition
+
+    def reshuffle(self, values=None):
+        """Mark every card in the shoe as unseen again.
+
+        Values gives the shoe as a buffer of card values, for shoes that
+        are not made of whole decks such as traces.
+        """
+        if values is None:
+            self._counts = [4 * self._num_decks] * 9 + [16 * self._num_decks]
+            self._remaining = 52 * self._num_decks
+        else:
+            self._counts = [values.count(value) for value in range(1, 11)]
+            self._remaining = len(values)
+        self._running_count = 0
+
+    def see(self, card):
+        """Remove a card that has been shown from the unseen counts."""
+        value = int(card)
+        self._counts[value - 1] -= 1
+        self._remaining -= 1
+        self._running_count += self.hi_lo[value - 1]
+
+    def true_count(self):
+        """Running count per deck of unseen cards."""
+        if self._remaining == 0:
+            return 0.0
+        return self._running_count * 52 / self._remaining
@@ -0,0 +1,245 @@
+"""EV module. Exact composition dependent expected values for a shoe."""
+
+
+from blackjackgame.rules import DEFAULT_RULES
+from blackjackgame.strategy import STAND, HIT, DOUBLE, SPLIT, SURRENDER
+
+
+# Index of the bust probability in dealer outcomes; 0-4 are totals 17-21
+BUST = 5
+
+
+def shoe_counts(num_decks):
+    """Number of cards of each value in a shoe, Aces first, tens last."""
+    return [4 * num_decks] * 9 + [16 * num_decks]
+
+
+def _total(hard, ace):
+    """Best total of a hand from its hard sum."""
+    return hard + 10 if ace and hard <= 11 else hard
+
+
+class ExactEV:
+    """Expected values computed by drawing every card from the shoe.
+
+    Each method returns a pair of the expected value and the expected
+    square of the result so that variance can be derived. Counts are
+    lists of ten card counts that exclude the player's cards and the
+    dealer's upcard.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, counts=None):
+        """Class constructor. Starts from a full shoe unless given counts."""
+        self._rules = rules
+        if counts is None:
+            counts = shoe_counts(rules.num_decks)
+        self._counts = list(counts)
+        self._dealer_memo = {}
+        self._hand_memo = {}
+
+    @property
+    def rules(self):
+        """Getter for rules."""
+        return self._rules
+
+    @property
+    def counts(self):
+        """Getter for the starting shoe composition."""
+        return self._counts
+
+    def dealer_outcomes(self, counts, upcard):
+        """Probabilities of the dealer finishing on 17-21 or busting."""
+        return self._dealer(counts, upcard, upcard == 1)
+
+    def _dealer(self, counts, hard, ace):
+        """Dealer outcome probabilities from a partial dealer hand."""
+        total = _total(hard, ace)
+        if total > 21:
+            return (0.0, 0.0, 0.0, 0.0, 0.0, 1.0)
+        if total >= 17 and not (
+            total == 17 and hard == 7 and self._rules.hits_soft_17
+        ):
+            outcomes = [0.0] * 6
+            outcomes[total - 17] = 1.0
+            return tuple(outcomes)
+
+        key = (tuple(counts), hard, ace)
+        if key in self._dealer_memo:
+            return self._dealer_memo[key]
+        result = self._dealer_draw(counts, hard, ace)
+        self._dealer_memo[key] = result
+        return result
+
+    def _dealer_draw(self, counts, hard, ace):
+        """Dealer outcome probabilities averaged over the next card."""
+        outcomes = [0.0] * 6
+        remaining = sum(counts)
+        for i, count in enumerate(counts):
+            if count:
+                counts[i] -= 1
+                sub = self._dealer(counts, hard + i + 1, ace or i == 0)
+                counts[i] += 1
+                prob = count / remaining
+                for j in range(6):
+                    outcomes[j] += prob * sub[j]
+        return tuple(outcomes)
+
+    def stand(self, counts, total, upcard):
+        """Standing on a total."""
+        if total > 21:
+            return -1.0, 1.0
+        outcomes = self.dealer_outcomes(counts, upcard)
+        win = outcomes[BUST]
+        lose = 0.0
+        for j in range(5):
+            if 17 + j < total:
+                win += outcomes[j]
+            elif 17 + j > total:
+                lose += outcomes[j]
+        return win - lose, win + lose
+
+    def best(self, counts, hard, ace, upcard):
+        """Best of standing and hitting, with no double or split."""
+        total = _total(hard, ace)
+        if total > 21:
+            return -1.0, 1.0
+        stand = self.stand(counts, total, upcard)
+        if total == 21:
+            return stand
+
+        key = (tuple(counts), hard, ace, upcard)
+        if key in self._hand_memo:
+            return self._hand_memo[key]
+        hit = self.hit(counts, hard, ace, upcard)
+        result = hit if hit[0] > stand[0] else stand
+        self._hand_memo[key] = result
+        return result
+
+    def hit(self, counts, hard, ace, upcard):
+        """Taking one card then playing on as well as possible."""
+        ev = ev2 = 0.0
+        remaining = sum(counts)
+        for i, count in enumerate(counts):
+            if count:
+                counts[i] -= 1
+                sub = self.best(counts, hard + i + 1, ace or i == 0, upcard)
+                counts[i] += 1
+                prob = count / remaining
+                ev += prob * sub[0]
+                ev2 += prob * sub[1]
+        return ev, ev2
+
+    def double(self, counts, hard, ace, upcard):
+        """Doubling the wager and taking exactly one card."""
+        ev = ev2 = 0.0
+        remaining = sum(counts)
+        for i, count in enumerate(counts):
+            if count:
+                counts[i] -= 1
+                total = _total(hard + i + 1, ace or i == 0)
+                sub = self.stand(counts, total, upcard)
+                counts[i] += 1
+                prob = count / remaining
+                ev += prob * sub[0]
+                ev2 += prob * sub[1]
+        return 2 * ev, 4 * ev2
+
+    def split(self, counts, value, upcard):
+        """Splitting a pair. Counts exclude both cards of the pair.
+
+        Each hand receives a second card and may double but not split
+        again. The two hands are treated as independent for the second
+        moment.
+        """
+        ev = ev2 = 0.0
+        remaining = sum(counts)
+        for i, count in enumerate(counts):
+            if count:
+                counts[i] -= 1
+                hard = value + i + 1
+                ace = value == 1 or i == 0
+                sub = max(
+                    self.best(counts, hard, ace, upcard),
+                    self.double(counts, hard, ace, upcard),
+                )
+                counts[i] += 1
+                prob = count / remaining
+                ev += prob * sub[0]
+                ev2 += prob * sub[1]
+        return 2 * ev, 2 * ev2 + 2 * ev * ev
+
+    def hand_actions(self, counts, hard, ace, upcard, pair=0):
+        """Values of every action for a two card hand."""
+        total = _total(hard, ace)
+        actions = {
+            STAND: self.stand(counts, total, upcard),
+            HIT: self.hit(counts, hard, ace, upcard),
+            DOUBLE: self.double(counts, hard, ace, upcard),
+        }
+        if pair:
+            actions[SPLIT] = self.split(counts, pair, upcard)
+        if self._rules.surrender:
+            actions[SURRENDER] = (-0.5, 0.25)
+        return actions
+
+    def natural(self, counts, upcard):
+        """Value of a natural, which pushes against any dealer 21."""
+        win = 1.0 - self.dealer_outcomes(counts, upcard)[4]
+        pays = self._rules.blackjack_pays
+        return pays * win, pays * pays * win
+
+    def initial(self, first, second, upcard):
+        """Values of every action for the first two cards and an upcard."""
+        counts = list(self._counts)
+        for value in (first, second, upcard):
+            counts[value - 1] -= 1
+        hard = first + second
+        ace = first == 1 or second == 1
+        if ace and hard == 11:
+            return {STAND: self.natural(counts, upcard)}
+        pair = first if first == second else 0
+        return self.hand_actions(counts, hard, ace, upcard, pair)
+
+    def first_card_ev(self, upcard, first):
+        """Contribution of the hands with a given first card to a round.
+
+        Returns the probability weighted expected value and expected
+        square over every second card dealt to the player, counting each
+        unordered pair of cards once.
+        """
+        counts = self._counts
+        remaining = sum(counts)
+        ev = ev2 = 0.0
+        for second in range(first, 11):
+            # Deal order is player, dealer, player
+            prob = counts[first - 1] / remaining
+            prob *= (counts[upcard - 1] - (upcard == first)) / (remaining - 1)
+            prob *= (
+                counts[second - 1] - (second == first) - (second == upcard)
+            ) / (remaining - 2)
+            if first != second:
+                prob *= 2
+            if prob <= 0:
+                continue
+            best = max(self.initial(first, second, upcard).values())
+            ev += prob * best[0]
+            ev2 += prob * best[1]
+        return ev, ev2
+
+    def upcard_ev(self, upcard):
+        """Contribution of one upcard to the expected value of a round."""
+        ev = ev2 = 0.0
+        for first in range(1, 11):
+            first_ev, first_ev2 = self.first_card_ev(upcard, first)
+            ev += first_ev
+            ev2 += first_ev2
+        return ev, ev2
+
+    def round_ev(self):
+        """Expected value and variance of a round played perfectly."""
+        ev = ev2 = 0.0
+        for upcard in range(1, 11):
+            up_ev, up_ev2 = self.upcard_ev(upcard)
+            ev += up_ev
+            ev2 += up_ev2
+        return ev, ev2 - ev * ev
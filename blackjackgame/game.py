@@ -1,12 +1,23 @@
 """Game module. Contains all properties of main game like gameloop."""
 
 
-from blackjackgame.player import Player, Dealer, to_file, from_file
-from blackjackgame.cards import Deck
+from blackjackgame.player import Player, Dealer, PlayerStore
+from blackjackgame.cards import Deck, Composition
+from blackjackgame.rules import DEFAULT_RULES
+from blackjackgame.traces import trace_values
 from blackjackgame.miscellaneous import type_effect, print_line
 from blackjackgame.miscellaneous import prompt_str, prompt_int
 
 
+# Steps of a round in order, a restored round carries on from its step
+ROUND_STEPS = (
+    'place_bets', 'deal_all', 'prompt_insurance', 'take_turns',
+    'check_win', 'endgame',
+)
+# Seats for players and bots, not counting the dealer
+MAX_SEATS = 4
+
+
 def prompt_rules():
     """Ask players if they want to see the game rules."""
     qtn = (
@@ -45,7 +56,7 @@ def prompt_rules():
             "\nnot be able to add any more cards to your hand for the rest of"
             "\nthe current round."
             #
-            "\n\nIf the dealer's face-up card is valued at 10 or higher, you"
+            "\n\nIf the dealer's face-up card is an Ace or valued at 10, you"
             "\nhave the option to buy insurance. This means if the dealer's"
             "\nface-down card results in a total of 21, you will be awarded"
             "\nmoney equal to your insurance."
@@ -69,27 +80,64 @@ def prompt_rules():
 class BlackjackGame:
     """Contains all methods related to game functionality."""
 
-    def __init__(self):
-        """Constructor. Initializes game variables and player count."""
+    def __init__(
+        self, rules=DEFAULT_RULES, bots=(), shoes=None, welcome=True
+    ):
+        """Constructor. Initializes game variables and player count.
+
+        Shoes is an optional iterable of traces dealt in order instead of
+        shuffled shoes, until it runs out. Welcome is turned off for games
+        restored from a snapshot. Only the simulation and exact engines
+        play surrender and bonus payouts for naturals, so the game rejects
+        rules that ask for them.
+        """
+        if rules.surrender:
+            raise ValueError("The game does not offer surrender.")
+        if rules.blackjack_pays != 1:
+            raise ValueError(
+                "The game pays naturals even money, "
+                f"not {rules.blackjack_pays} to 1."
+            )
+        self.rules = rules
+        self.bots = list(bots)
+        if len(self.bots) > MAX_SEATS:
+            raise ValueError(f"The table only seats {MAX_SEATS} players.")
+        self.shoes = iter(shoes) if shoes is not None else None
         self.player_list = []
         self.gameover = False
-        self.full_player_list = from_file("players.db")
-        self.deck = Deck(60, 80)
-        for _ in range(7):
-            self.deck.merge(Deck())
-        self.deck.shuffle_and_cut()
+        self.step = 0
+        self.turn = 0
+        # Players and the shoe are loaded when first needed
+        self.player_store = PlayerStore("players.db")
+        self._deck = None
+        self.composition = Composition(rules.num_decks)
 
         # Welcoming players
-        type_effect("Welcome to Blackjack!")
-        prompt_rules()
+        if welcome:
+            type_effect("Welcome to Blackjack!")
+            prompt_rules()
+
+    @property
+    def deck(self):
+        """Shoe being dealt from, built the first time a card is dealt."""
+        if self._deck is None:
+            self._deck = self.new_shoe()
+        return self._deck
+
+    @deck.setter
+    def deck(self, deck):
+        """Setter for deck. None builds a new shoe when next needed."""
+        self._deck = deck
 
     def set_players(self):
         """Creates all players and sets turn order based on player rolls."""
 
-        # Getting player count
-        qtn = "\nPlease enter the total number of players (1-4): "
+        # Getting player count, bots take up seats at the table
+        fewest = 0 if self.bots else 1
+        most = MAX_SEATS - len(self.bots)
+        qtn = f"\nPlease enter the total number of players ({fewest}-{most}): "
         num_players = prompt_int(
-            question=qtn, less_than=1, greater_than=4, newline=False
+            question=qtn, less_than=fewest, greater_than=most, newline=False
         )
 
         # Creating and naming all players.
@@ -104,46 +152,43 @@ class BlackjackGame:
             name = input()
 
             # If player in database, retrieve player stats
-            if len(self.full_player_list) != 0:
-                for plr in self.full_player_list:
-                    if plr.name == name:
-                        type_effect(
-                            f"\nWelcome back, {plr.name}!"
-                            f"\nYou have ${plr.balance} in your account."
-                        )
-                        temp = plr
-                        break
-
-                    # Player does not exist, create new player
-                    if plr == self.full_player_list[-1]:
-                        type_effect(
-                            "\nNew player created."
-                            "\n$10000 has been added to your account."
-                        )
-                        temp = Player(name)
+            plr = self.player_store.get(name)
+            if plr is not None:
+                type_effect(
+                    f"\nWelcome back, {plr.name}!"
+                    f"\nYou have ${plr.balance} in your account."
+                )
+                temp = plr
+
+            # Player does not exist, create new player
             else:
                 type_effect(
                     "\nNew player created."
-                    "\n$10000 have been added to your account."
+                    "\n$10000 has been added to your account."
                 )
                 temp = Player(name)
             self.player_list.append(temp)
-        self.player_list.append(Dealer())
+
+        self.seat_bots()
         print_line(before=True)
 
+    def seat_bots(self):
+        """Seat the bots after the players, then the dealer."""
+        dealer = Dealer(self.rules.hits_soft_17)
+        for bot in self.bots:
+            bot.dealer = dealer
+            bot.counter = self.composition
+            bot.rules = self.rules
+            self.player_list.append(bot)
+        self.player_list.append(dealer)
+
     def place_bets(self):
         """Ask players for their wagers."""
         for plr in self.player_list:
             if not plr.is_dealer:
-                qtn = (
-                    f"\n{plr.name}, you have ${plr.balance} in your account."
-                    "\nHow much would you like to wager?"
-                )
-                bet = prompt_int(
-                    question=qtn, less_than=1, greater_than=plr.balance
-                )
-                plr.bet.append(bet)
-                print_line(before=True)
+                plr.bet.append(plr.wager())
+                if not plr.is_bot:
+                    print_line(before=True)
 
         # Display all players and their wagers
         type_effect("\nPlayers and Wagers")
@@ -155,11 +200,13 @@ class BlackjackGame:
 
     def deal_all(self):
         """Deal all players their hands."""
+        type_effect("\nThe game will now begin!")
         type_effect("\nDealing cards...")
-        for _ in range(2):
+        for i in range(2):
             for plr in self.player_list:
-                card = self.deck.deal()
-                plr.add_to_hand(card[0])
+                # Dealer's second card is face down
+                hidden = plr.is_dealer and i == 1
+                plr.add_to_hand(self.deal_card(hidden))
         for plr in self.player_list:
             type_effect(f"\n{plr.name}:")
             type_effect("Hand: ", newline=False)
@@ -172,26 +219,18 @@ class BlackjackGame:
             if not plr.is_dealer:
                 dealer_card = self.player_list[-1].hand[0][0]
                 if int(dealer_card) >= 10 or dealer_card.rank == 'Ace':
-                    qtn = f"\n{plr.name}, do you want to buy insurance? (y/n)"
-                    if prompt_str(question=qtn, true='y', false='n'):
-                        qtn = "\nHow much do you want to buy?"
-                        plr.insurance = prompt_int(
-                            question=qtn,
-                            less_than=1,
-                            greater_than=plr.balance - plr.bet[0],
-                        )
-                    print_line(before=True)
+                    plr.insurance = plr.insurance_wager()
+                    if not plr.is_bot:
+                        print_line(before=True)
 
     def prompt_split(self, player):
         """Determines if player will split based on player's input."""
 
-        qtn = f"\nDo you want to split your hand? (y/n)"
-        if prompt_str(question=qtn, true='y', false='n'):
+        if player.does_split():
             card = player.hand[0].pop()
             player.add_to_hand(card, index=1)
             for i in range(2):
-                card = self.deck.deal()
-                player.add_to_hand(card[0], index=i)
+                player.add_to_hand(self.deal_card(), index=i)
             player.bet.append(player.bet[0])
 
             type_effect("\nHand 1: ", newline=False)
@@ -202,15 +241,9 @@ class BlackjackGame:
     def prompt_double_down(self, player, index):
         """Determines if player will double down based on player's input."""
 
-        if player.has_split():
-            qtn = f"\nDo you want to double down on hand {index + 1}? (y/n)"
-        else:
-            qtn = "\nDo you want to double down on your hand? (y/n)"
-
-        if prompt_str(question=qtn, true='y', false='n'):
+        if player.does_double_down(index):
             player.bet[index] *= 2
-            card = self.deck.deal()
-            player.add_to_hand(card[0], index=index)
+            player.add_to_hand(self.deal_card(), index=index)
 
             type_effect("\nNew Hand: ", newline=False)
             player.display_hand(index=index)
@@ -230,8 +263,7 @@ class BlackjackGame:
                 player.player_list = self.player_list
             if not player.does_hit(index=i):
                 break
-            card = self.deck.deal()
-            player.hand[i].append(card[0])
+            player.hand[i].append(self.deal_card())
             if player.has_split():
                 type_effect(f"\nHand {i + 1}: ", newline=False)
             else:
@@ -251,7 +283,9 @@ class BlackjackGame:
 
     def check_insurance_bets(self, player):
         """Update player balances based on insurance bets."""
-        if int(player.hand[0][0]) >= 10:
+        upcard = player.hand[0][0]
+        pays = self.rules.insurance_pays
+        if int(upcard) == 10 or upcard.rank == 'Ace':
             dealer_total = player.hand_sum(0)
             if dealer_total == 21:
                 type_effect(
@@ -261,11 +295,12 @@ class BlackjackGame:
                 for plr in self.player_list:
                     if not plr.is_dealer:
                         if plr.insurance:
+                            winnings = plr.insurance * pays
                             type_effect(
-                                f"\n{plr.name} wins ${plr.insurance}!"
+                                f"\n{plr.name} wins ${winnings}!"
                                 f"\nOld balance: ${plr.balance}"
                             )
-                            plr.balance += plr.insurance
+                            plr.balance += winnings
                             type_effect(f"New balance: ${plr.balance}")
             else:
                 type_effect(
@@ -319,6 +354,7 @@ class BlackjackGame:
         # Dealer
         else:
             player.hidden = False
+            self.composition.see(player.hand[0][1])
             type_effect(f"\n{player.name}'s Hand: ", newline=False)
             player.display_hand()
             self.check_insurance_bets(player)
@@ -390,8 +426,7 @@ class BlackjackGame:
 
         qtn = "\nDo you all want to play again? (y/n)"
         if prompt_str(question=qtn, true='y', false='n'):
-            for plr in self.player_list:
-                plr.reset()
+            self.reset_values()
             type_effect("\nResetting game...")
             print_line(before=True)
         else:
@@ -409,39 +444,63 @@ class BlackjackGame:
 
         # Reset deck if cut card has been reached
         if self.deck.needs_shuffling():
-            self.deck = Deck(52 * 8 - 80, 52 * 8 - 60)
-            for _ in range(7):
-                self.deck.merge(Deck())
-            self.deck.shuffle_and_cut()
+            self.deck = None
+
+    def deal_card(self, hidden=False):
+        """Deal one card, counting it as seen unless it is face down."""
+        card = self.deck.deal()[0]
+        if not hidden:
+            self.composition.see(card)
+        return card
+
+    def new_shoe(self):
+        """Merge, shuffle and cut the decks that make up the shoe.
+
+        A trace is dealt instead while there are traces left. Every card
+        of the new shoe is marked unseen again.
+        """
+        codes = next(self.shoes, None) if self.shoes is not None else None
+        if codes is not None:
+            if len(codes) <= self.rules.cut_card_min:
+                raise ValueError(
+                    f"A trace of {len(codes)} cards does not reach the cut "
+                    f"card, placed {self.rules.cut_card_min} cards from the "
+                    "bottom."
+                )
+            self.composition.reshuffle(trace_values(codes))
+            return Deck.from_codes(codes, self.rules.cut_card_min)
+
+        deck = Deck(self.rules.cut_card_min, self.rules.cut_card_max)
+        for _ in range(self.rules.num_decks - 1):
+            deck.merge(Deck())
+        deck.shuffle_and_cut()
+        self.composition.reshuffle()
+        return deck
 
     def update_db(self):
         """Updating database player list with new balances and players."""
-        if len(self.full_player_list) == 0:
-            self.full_player_list = self.player_list[
-                0 : len(self.full_player_list) - 1
-            ]
-        else:
-            for i in self.player_list:
-                for j in self.full_player_list:
-                    if not i.is_dealer:
-                        if i.name == j.name:
-                            j = i
-                            break
-                        if j == self.full_player_list[-1]:
-                            self.full_player_list.append(i)
-        to_file("players.db", self.full_player_list)
+        for plr in self.player_list:
+            if not plr.is_dealer and not plr.is_bot:
+                self.player_store.add(plr)
+        self.player_store.save()
+
+    def take_turns(self):
+        """Give each player their turn, ending with the dealer."""
+        while self.turn < len(self.player_list):
+            self.take_turn(self.player_list[self.turn])
+            self.turn += 1
+        self.turn = 0
+
+    def play_round(self):
+        """Play one round, from wagers to asking to play again."""
+        while self.step < len(ROUND_STEPS):
+            getattr(self, ROUND_STEPS[self.step])()
+            self.step += 1
+        self.step = 0
 
     def run(self):
-        """Contains gameloop. Creates players and begins game."""
-        self.set_players()
+        """Contains gameloop. Creates players unless restored, then plays."""
+        if not self.player_list:
+            self.set_players()
         while not self.gameover:
-            self.place_bets()
-            type_effect("\nThe game will now begin!")
-            self.deal_all()
-            self.prompt_insurance()
-
-            for plr in self.player_list:
-                self.take_turn(plr)
-
-            self.check_win()
-            self.endgame()
+            self.play_round()
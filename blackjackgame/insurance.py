@@ -0,0 +1,26 @@
+"""Insurance module. Decides insurance from the cards not yet seen."""
+
+
+def blackjack_probability(counts, remaining, upcard):
+    """Chance that the face down card gives the dealer a two card 21.
+
+    Counts are the unseen cards by value, Aces first, and remaining is
+    their total. The face down card is one of the unseen cards.
+    """
+    if remaining <= 0:
+        return 0.0
+    if upcard == 1:
+        return counts[9] / remaining
+    if upcard == 10:
+        return counts[0] / remaining
+    return 0.0
+
+
+def insurance_ev(probability, pays=1):
+    """Expected value of insurance per unit wagered."""
+    return probability * pays - (1 - probability)
+
+
+def takes_insurance(probability, pays=1):
+    """Insurance is worth buying only when it is expected to profit."""
+    return insurance_ev(probability, pays) > 0
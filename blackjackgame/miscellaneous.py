@@ -1,16 +1,32 @@
 """This module contains random functions used by the other modules."""
 
 
-from sys import stdout
+import os
+import sys
 from time import sleep
 
 
+# Turned off for scripted games, which have no one to type for
+_typing = True
+
+
+def set_typing_effect(enabled):
+    """Turn the typing effect of type_effect on or off."""
+    global _typing
+    _typing = enabled
+
+
 def type_effect(text, newline=True, speed=0.05):
     """Prints strings one character at a time for a typing effect."""
-    for char in text:
-        stdout.write(char)
-        stdout.flush()
-        sleep(speed)
+    # Looked up on each call so that redirect_stdout applies
+    stdout = sys.stdout
+    if not _typing:
+        stdout.write(text)
+    else:
+        for char in text:
+            stdout.write(char)
+            stdout.flush()
+            sleep(speed)
     if newline:
         print()
 
@@ -60,3 +76,39 @@ def prompt_int(question, less_than, greater_than, newline=True):
             # Input is valid
             else:
                 return val
+
+
+def whole_dollars(amount):
+    """Amount as an int, for balances and wagers stored as whole dollars."""
+    if amount != int(amount):
+        raise ValueError(f"${amount} is not a whole dollar amount.")
+    return int(amount)
+
+
+class AtomicWrite:
+    """File opened for writing under a temporary name in a with block.
+
+    The file replaces the one at the path when the block ends, so readers
+    never see it half written. It is removed instead if the block raises.
+    """
+
+    def __init__(self, path, mode='wb', encoding=None):
+        """Class constructor. The file is opened by the with statement."""
+        self._path = path
+        self._temp = f"{path}.{os.getpid()}.tmp"
+        self._mode = mode
+        self._encoding = encoding
+        self._file = None
+
+    def __enter__(self):
+        """Open the temporary file and return it."""
+        self._file = open(self._temp, self._mode, encoding=self._encoding)
+        return self._file
+
+    def __exit__(self, exc_type, *exc_info):
+        """Close the file, then move it into place or remove it."""
+        self._file.close()
+        if exc_type is None:
+            os.replace(self._temp, self._path)
+        else:
+            os.remove(self._temp)
@@ -0,0 +1,210 @@
+"""Parallel module. Exact expected values computed by a pool of processes.
+
+Work is split by dealer upcard and the player's first card, or by true
+count bucket and upcard when building tables. Dealer outcome
+probabilities, which make up most of the work, are published into a
+hash table in shared memory so that each worker reuses the results the
+others have already computed instead of drawing them out again.
+"""
+
+
+import struct
+import zlib
+from multiprocessing import Lock, Pool
+from multiprocessing.shared_memory import SharedMemory
+
+from blackjackgame.ev import ExactEV, shoe_counts
+from blackjackgame.rules import DEFAULT_RULES
+from blackjackgame.tables import (
+    empty_tables, fill_column, table_column, true_count_counts,
+)
+
+
+# Ten card counts, hard total and Ace flag of a partial dealer hand
+KEY = struct.Struct('<10HBB')
+# Slot state, key and the six dealer outcome probabilities
+SLOT = struct.Struct('<B' + KEY.format[1:] + '6d')
+EMPTY = 0
+READY = 1
+# Slots tried before giving up on a key, which is then kept local
+MAX_PROBES = 8
+# A round has over a million dealer hands, more than fit in the 64 MB
+# /dev/shm Docker gives containers by default. The slots fill with the
+# hands the workers reach first, and the rest are kept local.
+DEFAULT_SLOTS = (48 << 20) // SLOT.size
+
+_memo = None
+_calculators = {}
+
+
+class SharedMemo:
+    """Open addressing hash table of dealer outcomes in shared memory.
+
+    Slots are only ever filled, never changed, so readers do not take
+    the lock. Writers hold it while they claim a slot and mark the slot
+    ready only after the outcomes are written. Keys are hashed with
+    crc32 because the built in hash differs between processes.
+    """
+
+    def __init__(self, slots=DEFAULT_SLOTS, name=None, lock=None):
+        """Class constructor. Creates a table unless given one's name."""
+        if name is None:
+            self._memory = SharedMemory(create=True, size=slots * SLOT.size)
+        else:
+            self._memory = SharedMemory(name=name)
+        self._slots = self._memory.size // SLOT.size
+        self._lock = lock if lock is not None else Lock()
+
+    @property
+    def name(self):
+        """Getter for the shared memory block name."""
+        return self._memory.name
+
+    @property
+    def lock(self):
+        """Getter for the lock held by writers."""
+        return self._lock
+
+    @property
+    def slots(self):
+        """Getter for the number of slots."""
+        return self._slots
+
+    def __len__(self):
+        """Override len method to return number of filled slots."""
+        states = self._memory.buf[:self._slots * SLOT.size:SLOT.size]
+        return bytes(states).count(READY)
+
+    def _probe(self, key):
+        """Offsets of the slots a key may be stored in."""
+        start = zlib.crc32(key)
+        for i in range(MAX_PROBES):
+            yield (start + i) % self._slots * SLOT.size
+
+    def get(self, counts, hard, ace):
+        """Outcomes stored for a dealer hand, or None if there are none."""
+        key = KEY.pack(*counts, hard, ace)
+        buffer = self._memory.buf
+        for offset in self._probe(key):
+            if buffer[offset] == EMPTY:
+                return None
+            if buffer[offset + 1:offset + 1 + KEY.size] == key:
+                return SLOT.unpack_from(buffer, offset)[-6:]
+        return None
+
+    def put(self, counts, hard, ace, outcomes):
+        """Store the outcomes of a dealer hand if a slot is free."""
+        key = KEY.pack(*counts, hard, ace)
+        buffer = self._memory.buf
+        with self._lock:
+            for offset in self._probe(key):
+                if buffer[offset] == EMPTY:
+                    SLOT.pack_into(
+                        buffer, offset, EMPTY, *counts, hard, ace, *outcomes
+                    )
+                    buffer[offset] = READY
+                    return
+                if buffer[offset + 1:offset + 1 + KEY.size] == key:
+                    return
+
+    def close(self):
+        """Detach from the shared memory."""
+        self._memory.close()
+
+    def unlink(self):
+        """Free the shared memory once every process has detached."""
+        self._memory.unlink()
+
+
+class SharedExactEV(ExactEV):
+    """ExactEV that shares dealer outcomes through a SharedMemo."""
+
+    def __init__(self, memo, rules=DEFAULT_RULES, counts=None):
+        """Class constructor. Publishes dealer outcomes to a memo."""
+        super().__init__(rules, counts)
+        self._memo = memo
+
+    def _dealer_draw(self, counts, hard, ace):
+        """Dealer outcomes from the shared memo, computed if missing."""
+        outcomes = self._memo.get(counts, hard, ace)
+        if outcomes is None:
+            outcomes = super()._dealer_draw(counts, hard, ace)
+            self._memo.put(counts, hard, ace, outcomes)
+        return outcomes
+
+
+def _attach(name, lock):
+    """Pool initializer. Attaches a worker to the shared memo."""
+    global _memo
+    _memo = SharedMemo(name=name, lock=lock)
+    _calculators.clear()
+
+
+def _calculator(rules, counts):
+    """Calculator of a worker for a shoe, kept for its local memos."""
+    key = (rules, tuple(counts))
+    if key not in _calculators:
+        _calculators[key] = SharedExactEV(_memo, rules, counts)
+    return _calculators[key]
+
+
+def _first_card_task(task):
+    """Pool task. Contribution of one upcard and first card to a round."""
+    rules, counts, upcard, first = task
+    return _calculator(rules, counts).first_card_ev(upcard, first)
+
+
+def _column_task(task):
+    """Pool task. Table column of one bucket and upcard."""
+    rules, counts, bucket, upcard = task
+    return bucket, upcard, table_column(_calculator(rules, counts), upcard)
+
+
+def _run(function, tasks, processes, slots):
+    """Results of tasks run by a pool sharing a new memo."""
+    memo = SharedMemo(slots)
+    try:
+        with Pool(processes, _attach, (memo.name, memo.lock)) as pool:
+            results = list(pool.imap_unordered(function, tasks))
+    finally:
+        memo.close()
+        memo.unlink()
+    return results
+
+
+def parallel_round_ev(
+    rules=DEFAULT_RULES, counts=None, processes=None, slots=DEFAULT_SLOTS
+):
+    """Expected value and variance of a round, see ExactEV.round_ev.
+
+    Processes defaults to the number of CPUs.
+    """
+    if counts is None:
+        counts = shoe_counts(rules.num_decks)
+    tasks = [
+        (rules, counts, upcard, first)
+        for upcard in range(1, 11)
+        for first in range(1, 11)
+    ]
+    ev = ev2 = 0.0
+    for task_ev, task_ev2 in _run(_first_card_task, tasks, processes, slots):
+        ev += task_ev
+        ev2 += task_ev2
+    return ev, ev2 - ev * ev
+
+
+def parallel_tables(
+    rules=DEFAULT_RULES, buckets=range(-5, 6), processes=None,
+    slots=DEFAULT_SLOTS,
+):
+    """Decision and EV tables, see tables.compute_tables."""
+    buckets = list(buckets)
+    tasks = [
+        (rules, true_count_counts(rules.num_decks, true_count), bucket, upcard)
+        for bucket, true_count in enumerate(buckets)
+        for upcard in range(1, 11)
+    ]
+    actions, evs = empty_tables(len(buckets))
+    for bucket, upcard, column in _run(_column_task, tasks, processes, slots):
+        fill_column(actions, evs, bucket, upcard, column)
+    return actions, evs, buckets[0]
@@ -1,30 +1,145 @@
 """Player module consists of all human player and AI player properties."""
 
 
-import pickle
-from blackjackgame.miscellaneous import type_effect, prompt_str
-
-
-def to_file(pickle_file, players):
-    """Write players to database."""
-    with open(pickle_file, 'wb') as file_handle:
-        pickle.dump(players, file_handle, pickle.HIGHEST_PROTOCOL)
-
-
-def from_file(pickle_file):
-    """Read player from database."""
-    try:
-        with open(pickle_file, 'rb') as file_handle:
-            players = pickle.load(file_handle)
-    except Exception:
-        players = []
-        to_file(pickle_file, players)
-    return players
+import os
+import struct
+# pickle is imported where it is used, it is slow to import at startup
+from blackjackgame.miscellaneous import type_effect, prompt_str, prompt_int
+from blackjackgame.miscellaneous import AtomicWrite
+from blackjackgame.insurance import blackjack_probability, takes_insurance
+from blackjackgame.rules import DEFAULT_RULES
+from blackjackgame.strategy import (
+    hand_state, pair_state, table_index, RESOLVE, CAN_DOUBLE,
+    HIT, DOUBLE, SPLIT,
+)
+
+
+# Trailer of an indexed database: position of the index and a marker
+STORE_MAGIC = b'BJPS'
+TRAILER = struct.Struct('<Q4s')
+
+
+class PlayerStore:
+    """Player database that unpickles players one at a time by name.
+
+    The file holds each pickled player, then a pickled index of each
+    name's position and length, then a trailer pointing at the index.
+    Older databases holding a single pickled list are still read.
+    """
+
+    def __init__(self, pickle_file):
+        """Constructor. Nothing is read until a player is looked up."""
+        self._pickle_file = pickle_file
+        self._index = None
+        self._players = {}
+
+    def _read_index(self):
+        """Read the index, or every player from an older database.
+
+        A missing or empty file is an empty database. Anything else that
+        cannot be read raises ValueError, leaving the file untouched.
+        """
+        import pickle
+
+        damaged = f"{self._pickle_file} is damaged and cannot be read."
+        try:
+            with open(self._pickle_file, 'rb') as file_handle:
+                size = file_handle.seek(0, os.SEEK_END)
+                if size == 0:
+                    self._index = {}
+                    return
+                magic = None
+                if size >= TRAILER.size:
+                    file_handle.seek(size - TRAILER.size)
+                    offset, magic = TRAILER.unpack(
+                        file_handle.read(TRAILER.size)
+                    )
+                # Older databases are a single list of every player
+                file_handle.seek(offset if magic == STORE_MAGIC else 0)
+                stored = pickle.load(file_handle)
+        except FileNotFoundError:
+            self._index = {}
+            return
+        except OSError:
+            raise
+        except Exception as error:
+            raise ValueError(damaged) from error
+
+        if magic == STORE_MAGIC and isinstance(stored, dict):
+            self._index = stored
+        elif magic != STORE_MAGIC and isinstance(stored, list):
+            self._index = {}
+            for plr in stored:
+                self._players.setdefault(plr.name, plr)
+        else:
+            # Such as an indexed database with a damaged trailer, which
+            # starts with a single player
+            raise ValueError(damaged)
+
+    def get(self, name):
+        """Retrieve a player by name, or None if they are not stored."""
+        import pickle
+
+        if name in self._players:
+            return self._players[name]
+        if self._index is None:
+            self._read_index()
+            if name in self._players:
+                return self._players[name]
+        if name not in self._index:
+            return None
+
+        offset, length = self._index[name]
+        with open(self._pickle_file, 'rb') as file_handle:
+            file_handle.seek(offset)
+            plr = pickle.loads(file_handle.read(length))
+        self._players[name] = plr
+        return plr
+
+    def add(self, player):
+        """Add or replace a player to be written on the next save."""
+        self._players[player.name] = player
+
+    def save(self):
+        """Write the database. Players never looked up are not unpickled."""
+        import pickle
+
+        if self._index is None:
+            self._read_index()
+
+        index = {}
+        with AtomicWrite(self._pickle_file) as out:
+            if self._index:
+                with open(self._pickle_file, 'rb') as file_handle:
+                    for name, (offset, length) in self._index.items():
+                        if name not in self._players:
+                            file_handle.seek(offset)
+                            index[name] = (out.tell(), length)
+                            out.write(file_handle.read(length))
+            for name, plr in self._players.items():
+                data = pickle.dumps(plr, pickle.HIGHEST_PROTOCOL)
+                index[name] = (out.tell(), len(data))
+                out.write(data)
+
+            offset = out.tell()
+            pickle.dump(index, out, pickle.HIGHEST_PROTOCOL)
+            out.write(TRAILER.pack(offset, STORE_MAGIC))
+        self._index = index
 
 
 class Player:
     """Holds all player properties necessary for game, like name and hand."""
 
+    __slots__ = (
+        '_name',
+        '_balance',
+        '_bet',
+        '_insurance',
+        '_hand',
+        '_is_dealer',
+        '_hidden',
+    )
+
     def __init__(self, name, bankroll=10000):
         """Player constructor. Initializes Player attributes."""
         self._name = name
@@ -39,7 +154,7 @@ class Player:
         """Override Player str method."""
         return (
             f"\n{self._name}:"
-            f"\nBalance: ${self._balance}"
+            f"\nBalance: ${self.balance}"
             f"\nBets: {self._bet}"
             f"\nHands: {self._hand}"
         )
@@ -48,6 +163,13 @@ class Player:
         """Override Player repr method."""
         return f"Player({self._name}, {self._balance})"
 
+    def __setstate__(self, state):
+        """Restore a pickled player, including ones pickled before slots."""
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **state[1]}
+        for attr, value in state.items():
+            setattr(self, attr, value)
+
     @property
     def name(self):
         """Getter for player name."""
@@ -98,6 +220,46 @@ class Player:
         """Checks if player is dealer."""
         return self._is_dealer
 
+    @property
+    def is_bot(self):
+        """Checks if player's decisions are automated."""
+        return False
+
+    def wager(self):
+        """Ask player how much they want to wager."""
+        qtn = (
+            f"\n{self.name}, you have ${self.balance} in your account."
+            "\nHow much would you like to wager?"
+        )
+        return prompt_int(
+            question=qtn, less_than=1, greater_than=self.balance
+        )
+
+    def insurance_wager(self):
+        """Ask player how much insurance to buy. Zero if they decline."""
+        qtn = f"\n{self.name}, do you want to buy insurance? (y/n)"
+        if prompt_str(question=qtn, true='y', false='n'):
+            qtn = "\nHow much do you want to buy?"
+            return prompt_int(
+                question=qtn,
+                less_than=1,
+                greater_than=self.balance - self.bet[0],
+            )
+        return 0
+
+    def does_split(self):
+        """Determines if player will split based on player's input."""
+        qtn = "\nDo you want to split your hand? (y/n)"
+        return prompt_str(question=qtn, true='y', false='n')
+
+    def does_double_down(self, index=0):
+        """Determines if player will double down based on player's input."""
+        if self.has_split():
+            qtn = f"\nDo you want to double down on hand {index + 1}? (y/n)"
+        else:
+            qtn = "\nDo you want to double down on your hand? (y/n)"
+        return prompt_str(question=qtn, true='y', false='n')
+
     def can_split(self):
         """Determine if player can split hand."""
         # If two initial cards are the same
@@ -152,6 +314,10 @@ class Player:
             total += 10
         return total
 
+    def is_soft(self, index=0):
+        """Determine if an Ace in the hand is being counted as 11."""
+        return self.hand_sum(index) != sum(map(int, self._hand[index]))
+
     def display_hand(self, index=0):
         """Display player hand."""
         # Print hand 1
@@ -163,20 +329,25 @@ class Player:
 
     def reset(self):
         """Reset player values for new game."""
-        self._hand = [[], []]
-        self._bet = []
+        # Emptied in place so the lists are reused from round to round
+        for hand in self._hand:
+            hand.clear()
+        self._bet.clear()
         self._insurance = 0
 
 
 class Dealer(Player):
     """Inherits Player class properties. Represents AI player."""
 
-    def __init__(self):
+    __slots__ = ('_player_list', '_hits_soft_17')
+
+    def __init__(self, hits_soft_17=False):
         """Constructor for AI player."""
         super().__init__("JARVIS")
         self._is_dealer = True
         self._player_list = []
         self._hidden = True
+        self._hits_soft_17 = hits_soft_17
 
     @property
     def is_dealer(self):
@@ -222,6 +393,9 @@ class Dealer(Player):
         if total < 17:
             type_effect(f"\nHand total is less than 17. Must hit.")
             return True
+        if total == 17 and self._hits_soft_17 and self.is_soft(index):
+            type_effect("\nHand is a soft 17. Must hit.")
+            return True
         type_effect(f"\nHand is greater than or equal to 17. Must stand.")
         return False
 
@@ -241,6 +415,116 @@ class Dealer(Player):
 
     def reset(self):
         """Reset Dealer values for new game."""
-        self._hand = [[], []]
+        for hand in self._hand:
+            hand.clear()
         self._player_list = []
         self._hidden = True
+
+
+class BotPlayer(Player):
+    """Player whose decisions are looked up in a strategy table."""
+
+    __slots__ = ('_table', '_bet_size', '_rules', '_counter', '_dealer')
+
+    def __init__(
+        self, name, table, bankroll=10000, bet_size=10, rules=DEFAULT_RULES
+    ):
+        """Constructor for bot player. Table is a StrategyTable."""
+        super().__init__(name, bankroll)
+        self._table = table
+        self._bet_size = bet_size
+        self._rules = rules
+        self._counter = None
+        self._dealer = None
+
+    def __repr__(self):
+        """Override BotPlayer repr method."""
+        return f"BotPlayer({self._name}, {self._balance})"
+
+    @property
+    def is_bot(self):
+        """Checks if player's decisions are automated."""
+        return True
+
+    @property
+    def table(self):
+        """Getter for strategy table."""
+        return self._table
+
+    @property
+    def rules(self):
+        """Getter for the rules insurance is decided under."""
+        return self._rules
+
+    @rules.setter
+    def rules(self, rules):
+        """Setter for rules, set to the game's when the bot is seated."""
+        self._rules = rules
+
+    @property
+    def dealer(self):
+        """Getter for the dealer whose upcard decisions are made against."""
+        return self._dealer
+
+    @dealer.setter
+    def dealer(self, dealer):
+        """Setter for dealer."""
+        self._dealer = dealer
+
+    @property
+    def counter(self):
+        """Getter for the Composition the true count is taken from."""
+        return self._counter
+
+    @counter.setter
+    def counter(self, counter):
+        """Setter for counter."""
+        self._counter = counter
+
+    def _lookup(self, state, flags):
+        """Action from the table for a hand state against the upcard."""
+        bucket = 0
+        if self._counter is not None:
+            bucket = self._table.bucket(self._counter.true_count())
+        code = self._table.actions[
+            table_index(state, int(self._dealer.hand[0][0]), bucket)
+        ]
+        return RESOLVE[code * 4 + flags]
+
+    def _hand_state(self, index):
+        """Hand state of one of the bot's hands."""
+        hand = self._hand[index]
+        hard = sum(map(int, hand))
+        return hand_state(hard, any(card.rank == 'Ace' for card in hand))
+
+    def wager(self):
+        """Bots always wager their bet size, or all they have left."""
+        return min(self._bet_size, self.balance)
+
+    def insurance_wager(self):
+        """Insure half the wager when the unseen cards make it profitable."""
+        if self._counter is None:
+            return 0
+        probability = blackjack_probability(
+            self._counter.counts,
+            self._counter.remaining,
+            int(self._dealer.hand[0][0]),
+        )
+        if not takes_insurance(probability, self._rules.insurance_pays):
+            return 0
+        return max(0, min(self.bet[0] // 2 or 1, self.balance - self.bet[0]))
+
+    def does_split(self):
+        """Split if the table says to split the pair."""
+        state = pair_state(int(self._hand[0][0]))
+        return self._lookup(state, CAN_DOUBLE) == SPLIT
+
+    def does_double_down(self, index=0):
+        """Double down if the table says to double the hand."""
+        return self._lookup(self._hand_state(index), CAN_DOUBLE) == DOUBLE
+
+    def does_hit(self, index=0):
+        """Hit if the table says to hit the hand."""
+        if self.hand_sum(index) >= 21:
+            return False
+        return self._lookup(self._hand_state(index), 0) == HIT
@@ -0,0 +1,88 @@
+"""Rules module. Describes the table configuration a game is played under."""
+
+
+from collections import namedtuple
+
+
+_RulesTuple = namedtuple(
+    'Rules',
+    [
+        'num_decks',
+        'cut_card_min',
+        'cut_card_max',
+        'hits_soft_17',
+        'surrender',
+        'blackjack_pays',
+        'insurance_pays',
+    ],
+    defaults=[8, 60, 80, False, False, 1.0, 1],
+)
+
+
+class Rules(_RulesTuple):
+    """Table rules. Defaults match the terminal game.
+
+    num_decks -- decks merged into the shoe
+    cut_card_min, cut_card_max -- range the cut card is placed in, counted
+        in cards from the bottom of the shoe, see cut_card_range
+    hits_soft_17 -- dealer hits soft 17 instead of standing on all 17s
+    surrender -- late surrender on the first two cards, losing half the wager
+    blackjack_pays -- payout of a natural that the dealer does not match
+    insurance_pays -- payout of an insurance bet when the dealer has 21
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, *args, **kwargs):
+        """Constructor. Raises ValueError for a cut card outside the shoe."""
+        rules = super().__new__(cls, *args, **kwargs)
+        if not (
+            0 <= rules.cut_card_min
+            < rules.cut_card_max
+            <= 52 * rules.num_decks
+        ):
+            raise ValueError(
+                f"Cut card range {rules.cut_card_min}-{rules.cut_card_max} "
+                f"does not fit in a shoe of {rules.num_decks} decks."
+            )
+        return rules
+
+    @classmethod
+    def _make(cls, iterable):
+        """Rules from a sequence of values, checked like the constructor."""
+        # _replace builds its result with _make
+        return cls(*iterable)
+
+
+DEFAULT_RULES = Rules()
+PAYOUTS = ('blackjack_pays', 'insurance_pays')
+
+
+def cut_card_range(rules, num_decks):
+    """Cut card range for a shoe of another size, at the same penetration.
+
+    The range is a number of cards, so the default one left in a single
+    deck would reshuffle after every round.
+    """
+    return (
+        rules.cut_card_min * num_decks // rules.num_decks,
+        rules.cut_card_max * num_decks // rules.num_decks,
+    )
+
+
+def rules_to_dict(rules):
+    """Convert rules to a plain dictionary with JSON friendly values."""
+    return {
+        field: (float(value) if field in PAYOUTS else value)
+        for field, value in rules._asdict().items()
+    }
+
+
+def rule_hash(rules):
+    """Stable hex digest identifying a rule set."""
+    # Imported here to keep them out of the game's startup
+    import hashlib
+    import json
+
+    text = json.dumps(rules_to_dict(rules), sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
@@ -0,0 +1,286 @@
+"""Simulation module. Plays rounds without any input or output."""
+
+
+from random import Random
+from itertools import islice
+from collections import namedtuple
+
+from blackjackgame.cards import Composition
+from blackjackgame.insurance import blackjack_probability, takes_insurance
+from blackjackgame.traces import trace_values
+from blackjackgame.strategy import (
+    basic_strategy, hand_state, pair_state, table_index, RESOLVE,
+    STAND, HIT, DOUBLE, SPLIT, SURRENDER, CAN_DOUBLE, CAN_SURRENDER,
+)
+
+
+# Blackjack value of every card in a single deck
+DECK_VALUES = bytes(list(range(1, 11)) + [10, 10, 10]) * 4
+
+SimulationResult = namedtuple(
+    'SimulationResult', ['rounds', 'mean', 'variance']
+)
+
+
+def house_edge(result):
+    """House edge of a simulation result, as a fraction of the wager."""
+    return -result.mean
+
+
+class Shoe:
+    """Card values dealt from a cursor instead of Card objects."""
+
+    def __init__(self, values, cut_card_position=0):
+        """Class constructor. Wraps a buffer of card values."""
+        self._values = values
+        self._cursor = 0
+        self._cut_card_position = cut_card_position
+
+    def __len__(self):
+        """Override len method to return cards left in the shoe."""
+        return len(self._values) - self._cursor
+
+    @property
+    def values(self):
+        """Getter for the card values."""
+        return self._values
+
+    @property
+    def cursor(self):
+        """Getter for the position of the next card."""
+        return self._cursor
+
+    def draw(self):
+        """Deal the value of the next card."""
+        value = self._values[self._cursor]
+        self._cursor += 1
+        return value
+
+    def needs_shuffling(self):
+        """Check if cut card has been reached and shoe needs shuffling."""
+        return len(self._values) - self._cursor <= self._cut_card_position
+
+
+def new_shoe(rules, rng):
+    """Build and shuffle a shoe of card values for the given rules."""
+    values = bytearray(DECK_VALUES * rules.num_decks)
+    rng.shuffle(values)
+    return Shoe(values, rng.randrange(rules.cut_card_min, rules.cut_card_max))
+
+
+def dealer_total(draw, upcard, hole, hits_soft_17):
+    """Play out the dealer's hand and return its final total."""
+    hard = upcard + hole
+    ace = upcard == 1 or hole == 1
+    while True:
+        total = hard + 10 if ace and hard <= 11 else hard
+        if total > 17 or (total == 17 and not (hits_soft_17 and hard == 7)):
+            return total
+        card = draw()
+        hard += card
+        ace = ace or card == 1
+
+
+def _play_out(draw, actions, base, hand):
+    """Hit a hand until the table says stand. Hand is [hard, ace, stake]."""
+    hard, ace = hand[0], hand[1]
+    while hard < 21 and not (ace and hard == 11):
+        code = actions[base + hand_state(hard, ace) * 10]
+        if RESOLVE[code * 4] != HIT:
+            break
+        card = draw()
+        hard += card
+        ace = ace or card == 1
+    hand[0], hand[1] = hard, ace
+
+
+def insurance_result(composition, rules, first, second, upcard, hole):
+    """Net win of insuring half a wager, or zero if insurance is declined.
+
+    The composition holds the cards seen before this round, so the
+    player's cards and the upcard are taken out here.
+    """
+    if upcard != 1 and upcard != 10:
+        return 0.0
+    counts = list(composition.counts)
+    for value in (first, second, upcard):
+        counts[value - 1] -= 1
+    probability = blackjack_probability(
+        counts, composition.remaining - 3, upcard
+    )
+    if not takes_insurance(probability, rules.insurance_pays):
+        return 0.0
+    if upcard + hole == 11:
+        return 0.5 * rules.insurance_pays
+    return -0.5
+
+
+def play_round(shoe, rules, table, bucket=0, composition=None):
+    """Play one seat for one round. Returns the net win in wagers.
+
+    Insurance is only considered when the composition of cards seen
+    before the round is given.
+    """
+    draw = shoe.draw
+    actions = table.actions
+
+    # Dealt one at a time, player first, dealer's second card face down
+    first = draw()
+    upcard = draw()
+    second = draw()
+    hole = draw()
+    base = table_index(0, upcard, bucket)
+
+    insured = 0.0
+    if composition is not None:
+        insured = insurance_result(
+            composition, rules, first, second, upcard, hole
+        )
+
+    hard = first + second
+    ace = first == 1 or second == 1
+    if ace and hard == 11:
+        dealer = dealer_total(draw, upcard, hole, rules.hits_soft_17)
+        return insured + (0.0 if dealer == 21 else rules.blackjack_pays)
+
+    flags = CAN_DOUBLE | (CAN_SURRENDER if rules.surrender else 0)
+    state = pair_state(first) if first == second else hand_state(hard, ace)
+    action = RESOLVE[actions[base + state * 10] * 4 + flags]
+
+    if action == SURRENDER:
+        return insured - 0.5
+    if action == SPLIT:
+        hands = [[first, first == 1, 1], [first, first == 1, 1]]
+        for hand in hands:
+            card = draw()
+            hand[0] += card
+            hand[1] = hand[1] or card == 1
+    else:
+        hands = [[hard, ace, 1]]
+
+    # Doubling is offered on every hand before any hand is hit
+    finished = []
+    for hand in hands:
+        if action == SPLIT:
+            code = actions[base + hand_state(hand[0], hand[1]) * 10]
+            hand_action = RESOLVE[code * 4 + CAN_DOUBLE]
+        else:
+            hand_action = action
+        if hand_action == DOUBLE:
+            card = draw()
+            hand[0] += card
+            hand[1] = hand[1] or card == 1
+            hand[2] = 2
+        finished.append(hand_action == DOUBLE or hand_action == STAND)
+    for hand, done in zip(hands, finished):
+        if not done:
+            _play_out(draw, actions, base, hand)
+
+    # Dealer only plays if a hand is still standing
+    totals = [
+        hard + 10 if ace and hard <= 11 else hard for hard, ace, _ in hands
+    ]
+    dealer = 0
+    if min(totals) <= 21:
+        dealer = dealer_total(draw, upcard, hole, rules.hits_soft_17)
+
+    net = insured
+    for total, hand in zip(totals, hands):
+        if total > 21:
+            net -= hand[2]
+        elif dealer > 21 or total > dealer:
+            net += hand[2]
+        elif total < dealer:
+            net -= hand[2]
+    return net
+
+
+def round_results(shoe, rules, table):
+    """Generate the net win of each round until the cut card is reached.
+
+    At least one round is played. A trace that runs out in the middle
+    of a round ends the shoe without a result for that round.
+    """
+    values = shoe.values
+    composition = Composition.from_values(values[shoe.cursor :])
+    seen = shoe.cursor
+    while True:
+        for position in range(seen, shoe.cursor):
+            composition.see(values[position])
+        seen = shoe.cursor
+        bucket = table.bucket(composition.true_count())
+        try:
+            net = play_round(shoe, rules, table, bucket, composition)
+        except IndexError:
+            return
+        yield net
+        if shoe.needs_shuffling():
+            return
+
+
+def play_shoe(shoe, rules, table, limit=None):
+    """Play rounds until the cut card is reached, at least one round.
+
+    Returns the number of rounds with the sum of their results and of
+    their squares, see round_results.
+    """
+    rounds = 0
+    total = 0.0
+    total_sq = 0.0
+    for net in islice(round_results(shoe, rules, table), limit):
+        rounds += 1
+        total += net
+        total_sq += net * net
+    return rounds, total, total_sq
+
+
+def _result(rounds, total, total_sq):
+    """Simulation result from the sums kept while playing."""
+    if rounds == 0:
+        return SimulationResult(0, 0.0, 0.0)
+    mean = total / rounds
+    return SimulationResult(rounds, mean, total_sq / rounds - mean * mean)
+
+
+def simulate(rules, rounds, seed=None, table=None):
+    """Play many rounds and return the mean and variance per round.
+
+    Tables with more than one bucket are played by Hi-Lo true count,
+    taken at the start of each round. Insurance is bought whenever the
+    cards seen so far make it profitable.
+    """
+    rng = Random(seed)
+    if table is None:
+        table = basic_strategy(rules)
+
+    played = 0
+    total = 0.0
+    total_sq = 0.0
+    while played < rounds:
+        shoe = new_shoe(rules, rng)
+        shoe_rounds, shoe_total, shoe_sq = play_shoe(
+            shoe, rules, table, rounds - played
+        )
+        played += shoe_rounds
+        total += shoe_total
+        total_sq += shoe_sq
+    return _result(played, total, total_sq)
+
+
+def simulate_traces(traces, rules, tables):
+    """Play every table through the same traces, one result per table.
+
+    Traces are streamed, so a generator such as read_traces keeps only
+    one shoe in memory. Each trace is played down to the cut card at
+    the rules' minimum position.
+    """
+    sums = [[0, 0.0, 0.0] for _ in tables]
+    for codes in traces:
+        values = trace_values(codes)
+        for table, table_sums in zip(tables, sums):
+            shoe = Shoe(values, rules.cut_card_min)
+            shoe_rounds, shoe_total, shoe_sq = play_shoe(shoe, rules, table)
+            table_sums[0] += shoe_rounds
+            table_sums[1] += shoe_total
+            table_sums[2] += shoe_sq
+    return [_result(*table_sums) for table_sums in sums]
@@ -0,0 +1,234 @@
+"""Snapshot module. Compact binary snapshots of a table in play.
+
+A snapshot holds the rules, how far the round has got, the shoe as one
+byte per card code, the unseen card counts and each seat's balance,
+bets, insurance and hands. Taken between the steps of a round, see
+game.ROUND_STEPS, it lets another process restore the table and carry
+the round on from where it was left.
+"""
+
+
+import struct
+
+from blackjackgame.cards import CARDS, Composition, Deck, card_code
+from blackjackgame.game import BlackjackGame
+from blackjackgame.miscellaneous import AtomicWrite, whole_dollars
+from blackjackgame.player import Player, Dealer
+from blackjackgame.rules import Rules
+from blackjackgame.traces import record_deck
+
+
+MAGIC = b'BJSN'
+VERSION = 1
+# Magic, version, decks, cut card range, rule flags, payouts
+HEADER = struct.Struct('<4sHHHHBdd')
+# Game over, round step, turn, seats, cut card position, cards in shoe
+TABLE = struct.Struct('<BBBBHH')
+# Unseen counts with Aces first, Hi-Lo running count
+COMPOSITION = struct.Struct('<10Hh')
+# Kind, flags, balance, insurance, name length, bets, cards in each hand
+SEAT = struct.Struct('<BBqqBBBB')
+BET = struct.Struct('<q')
+
+# Rule flags
+HITS_SOFT_17 = 1
+SURRENDER = 2
+# Seat kinds and flags
+PLAYER = 0
+DEALER = 1
+BOT = 2
+HIDDEN = 1
+
+
+def _codes(cards):
+    """Card codes of a list of cards."""
+    return bytes(map(card_code, cards))
+
+
+def _pack_seat(player):
+    """Bytes of one seat at the table."""
+    if player.is_dealer:
+        kind = DEALER
+    elif player.is_bot:
+        kind = BOT
+    else:
+        kind = PLAYER
+    flags = HIDDEN if player.is_dealer and player.hidden else 0
+    name = player.name.encode('utf-8')
+    if len(name) > 255:
+        raise ValueError(f"Cannot store the name {player.name}, too long.")
+    hands = [_codes(hand) for hand in player.hand]
+    return b''.join(
+        [
+            SEAT.pack(
+                kind,
+                flags,
+                whole_dollars(player.balance),
+                whole_dollars(player.insurance),
+                len(name),
+                len(player.bet),
+                len(hands[0]),
+                len(hands[1]),
+            ),
+            name,
+            *(BET.pack(whole_dollars(bet)) for bet in player.bet),
+            *hands,
+        ]
+    )
+
+
+def snapshot(game):
+    """Bytes holding the state of a table.
+
+    A table that has not dealt yet builds its shoe first. Traces still
+    to be dealt and the players database are not part of the snapshot.
+    """
+    rules = game.rules
+    rule_flags = (HITS_SOFT_17 if rules.hits_soft_17 else 0) | (
+        SURRENDER if rules.surrender else 0
+    )
+    deck = game.deck
+    shoe = record_deck(deck)
+    composition = game.composition
+    return b''.join(
+        [
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                rules.num_decks,
+                rules.cut_card_min,
+                rules.cut_card_max,
+                rule_flags,
+                rules.blackjack_pays,
+                rules.insurance_pays,
+            ),
+            TABLE.pack(
+                game.gameover,
+                game.step,
+                game.turn,
+                len(game.player_list),
+                deck.cut_card_position,
+                len(shoe),
+            ),
+            shoe,
+            COMPOSITION.pack(
+                *composition.counts, composition.running_count
+            ),
+            *map(_pack_seat, game.player_list),
+        ]
+    )
+
+
+def _unpack_seat(data, offset, rules, bots):
+    """Player restored from a seat, and the offset after it."""
+    (
+        kind, flags, balance, insurance, name_length, num_bets, *lengths
+    ) = SEAT.unpack_from(data, offset)
+    offset += SEAT.size
+    name = bytes(data[offset:offset + name_length]).decode('utf-8')
+    offset += name_length
+    bets = [
+        BET.unpack_from(data, offset + i * BET.size)[0]
+        for i in range(num_bets)
+    ]
+    offset += num_bets * BET.size
+    hands = []
+    for length in lengths:
+        hands.append([CARDS[code] for code in data[offset:offset + length]])
+        offset += length
+
+    if kind == DEALER:
+        player = Dealer(rules.hits_soft_17)
+        player.hidden = bool(flags & HIDDEN)
+    elif kind == BOT:
+        if name not in bots:
+            raise ValueError(f"No bot named {name} to take its seat.")
+        player = bots[name]
+    else:
+        player = Player(name)
+    player.balance = balance
+    player.insurance = insurance
+    player.bet = bets
+    player.hand = hands
+    return player, offset
+
+
+def restore(data, bots=()):
+    """Table restored from a snapshot, ready for its run method.
+
+    Bots cannot be stored, so each bot seated in the snapshot must be
+    given, matched by name, to take its seat back.
+    """
+    data = memoryview(data)
+    if len(data) < HEADER.size + TABLE.size:
+        raise ValueError("Data is not a table snapshot.")
+    (
+        magic, version, num_decks, cut_card_min, cut_card_max, rule_flags,
+        blackjack_pays, insurance_pays,
+    ) = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Data is not a table snapshot.")
+    if version != VERSION:
+        raise ValueError(
+            f"Snapshot has format version {version}, expected {VERSION}."
+        )
+    rules = Rules(
+        num_decks,
+        cut_card_min,
+        cut_card_max,
+        bool(rule_flags & HITS_SOFT_17),
+        bool(rule_flags & SURRENDER),
+        blackjack_pays,
+        # Kept whole when it is so that balances stay whole dollars
+        int(insurance_pays) if insurance_pays.is_integer() else insurance_pays,
+    )
+    offset = HEADER.size
+    (
+        gameover, step, turn, num_seats, cut_card_position, shoe_length
+    ) = TABLE.unpack_from(data, offset)
+    offset += TABLE.size
+    shoe = data[offset:offset + shoe_length]
+    offset += shoe_length
+    *counts, running_count = COMPOSITION.unpack_from(data, offset)
+    offset += COMPOSITION.size
+
+    try:
+        bots = {bot.name: bot for bot in bots}
+        players = []
+        for _ in range(num_seats):
+            player, offset = _unpack_seat(data, offset, rules, bots)
+            players.append(player)
+    except struct.error as error:
+        raise ValueError("Snapshot ends in the middle of a seat.") from error
+    if offset != len(data):
+        raise ValueError("Snapshot does not end after its last seat.")
+
+    seated = [player for player in players if player.is_bot]
+    game = BlackjackGame(rules, seated, welcome=False)
+    game.gameover = bool(gameover)
+    game.step = step
+    game.turn = turn
+    game.deck = Deck.from_codes(shoe, cut_card_position)
+    game.composition = Composition.from_counts(
+        num_decks, counts, running_count
+    )
+    game.player_list = players
+    dealer = players[-1] if players else None
+    for player in players:
+        if player.is_bot:
+            player.dealer = dealer
+            player.counter = game.composition
+            player.rules = rules
+    return game
+
+
+def write_snapshot(path, game):
+    """Write a snapshot of a table to a file."""
+    with AtomicWrite(path) as file_handle:
+        file_handle.write(snapshot(game))
+
+
+def read_snapshot(path, bots=()):
+    """Table restored from a snapshot file, see restore."""
+    with open(path, 'rb') as file_handle:
+        return restore(file_handle.read(), bots)
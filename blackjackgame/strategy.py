@@ -0,0 +1,242 @@
+"""Strategy module. Flat lookup tables that map hand states to actions."""
+
+
+# Actions a player can take
+STAND, HIT, DOUBLE, SPLIT, SURRENDER = range(5)
+
+# Table codes. The second letter is the fallback when the action is not
+# allowed, e.g. Ds doubles if possible and stands otherwise.
+CODES = 'S H Dh Ds P Rh Rs Rp'.split()
+CODE_VALUES = {code: value for value, code in enumerate(CODES)}
+
+# Action for each code, indexed by code * 4 + flags where bit 0 of flags
+# means doubling is allowed and bit 1 means surrendering is allowed.
+RESOLVE = bytes([
+    STAND, STAND, STAND, STAND,
+    HIT, HIT, HIT, HIT,
+    HIT, DOUBLE, HIT, DOUBLE,
+    STAND, DOUBLE, STAND, DOUBLE,
+    SPLIT, SPLIT, SPLIT, SPLIT,
+    HIT, HIT, SURRENDER, SURRENDER,
+    STAND, STAND, SURRENDER, SURRENDER,
+    SPLIT, SPLIT, SURRENDER, SURRENDER,
+])
+CAN_DOUBLE = 1
+CAN_SURRENDER = 2
+# Code played in place of a surrender code when surrender is not offered
+PLAIN_CODES = {
+    CODE_VALUES['Rh']: CODE_VALUES['H'],
+    CODE_VALUES['Rs']: CODE_VALUES['S'],
+    CODE_VALUES['Rp']: CODE_VALUES['P'],
+}
+
+# Hand states: hard 4-21, soft 12-21, then pairs of Aces through tens
+HARD_STATES = 18
+SOFT_STATES = 10
+PAIR_STATES = 10
+NUM_STATES = HARD_STATES + SOFT_STATES + PAIR_STATES
+UPCARDS = 10
+BUCKET_SIZE = NUM_STATES * UPCARDS
+
+# Basic strategy for this game, upcards 2-10 then Ace. Matches ExactEV on a
+# full 8 deck shoe: the dealer does not check for blackjack, so a dealer 21
+# takes doubled and split wagers in full and surrender comes before it.
+HARD_CHART = {
+    7: 'H  H  H  H  H  H  H  H  H  Rh',
+    9: 'H  Dh Dh Dh Dh H  H  H  H  H',
+    10: 'Dh Dh Dh Dh Dh Dh Dh Dh H  H',
+    11: 'Dh Dh Dh Dh Dh Dh Dh Dh H  H',
+    12: 'H  H  S  S  S  H  H  H  H  Rh',
+    13: 'S  S  S  S  S  H  H  H  H  Rh',
+    14: 'S  S  S  S  S  H  H  H  H  Rh',
+    15: 'S  S  S  S  S  H  H  H  Rh Rh',
+    16: 'S  S  S  S  S  H  H  Rh Rh Rh',
+    17: 'S  S  S  S  S  S  S  S  S  Rs',
+}
+SOFT_CHART = {
+    13: 'H  H  H  Dh Dh H  H  H  H  H',
+    14: 'H  H  H  Dh Dh H  H  H  H  H',
+    15: 'H  H  Dh Dh Dh H  H  H  H  H',
+    16: 'H  H  Dh Dh Dh H  H  H  H  H',
+    17: 'H  Dh Dh Dh Dh H  H  H  H  H',
+    18: 'S  Ds Ds Ds Ds S  S  H  H  H',
+}
+PAIR_CHART = {
+    1: 'P  P  P  P  P  P  P  P  P  P',
+    2: 'P  P  P  P  P  P  H  H  H  H',
+    3: 'P  P  P  P  P  P  H  H  H  H',
+    4: 'H  H  H  P  P  H  H  H  H  H',
+    6: 'P  P  P  P  P  H  H  H  H  Rh',
+    7: 'P  P  P  P  P  P  H  H  Rh Rh',
+    8: 'P  P  P  P  P  P  P  P  Rh Rh',
+    9: 'P  P  P  P  P  S  P  P  S  S',
+}
+# Changes to the charts when the dealer hits soft 17
+HARD_H17 = {(6, 1): 'Rh'}
+SOFT_H17 = {(18, 2): 'Ds', (19, 6): 'Ds'}
+PAIR_H17 = {(3, 1): 'Rh'}
+
+
+def hard_state(total):
+    """State index of a hard total."""
+    return total - 4
+
+
+def soft_state(total):
+    """State index of a soft total."""
+    return HARD_STATES + total - 12
+
+
+def pair_state(value):
+    """State index of a pair of cards with the given value."""
+    return HARD_STATES + SOFT_STATES + value - 1
+
+
+def hand_state(hard, ace):
+    """State index of a hand from its hard sum and whether it holds an Ace."""
+    if ace and hard <= 11:
+        return HARD_STATES + hard - 2
+    return hard - 4
+
+
+def table_index(state, upcard, bucket=0):
+    """Position of a decision in a flat strategy table."""
+    return bucket * BUCKET_SIZE + state * UPCARDS + upcard - 1
+
+
+def chart_upcard(column):
+    """Convert a chart column (2-10 then Ace) to a card value."""
+    return column + 2 if column < 9 else 1
+
+
+class StrategyTable:
+    """Decisions stored in a flat buffer, one bucket per true count."""
+
+    def __init__(self, actions, min_bucket=0, num_buckets=1):
+        """Class constructor. Wraps a buffer of table codes."""
+        if len(actions) != num_buckets * BUCKET_SIZE:
+            raise ValueError("Strategy table has the wrong size.")
+        self._actions = actions
+        self._min_bucket = min_bucket
+        self._num_buckets = num_buckets
+
+    def __len__(self):
+        """Override len method to return number of entries."""
+        return len(self._actions)
+
+    @property
+    def actions(self):
+        """Getter for the flat buffer of table codes."""
+        return self._actions
+
+    @property
+    def min_bucket(self):
+        """Getter for the true count of the first bucket."""
+        return self._min_bucket
+
+    @property
+    def num_buckets(self):
+        """Getter for the number of true count buckets."""
+        return self._num_buckets
+
+    def bucket(self, true_count=0):
+        """Bucket for a true count, clamped to the table's range."""
+        bucket = int(true_count) - self._min_bucket
+        if bucket < 0:
+            return 0
+        if bucket >= self._num_buckets:
+            return self._num_buckets - 1
+        return bucket
+
+    def code(self, state, upcard, true_count=0):
+        """Table code for a hand state against an upcard."""
+        return self._actions[
+            table_index(state, upcard, self.bucket(true_count))
+        ]
+
+    def action(self, state, upcard, flags=0, true_count=0):
+        """Resolve the table code to an action that is allowed."""
+        return RESOLVE[self.code(state, upcard, true_count) * 4 + flags]
+
+
+def _fill_row(actions, state, row, overrides, key):
+    """Write a chart row into a single bucket table."""
+    for column, code in enumerate(row.split()):
+        upcard = chart_upcard(column)
+        code = overrides.get((key, upcard), code)
+        actions[table_index(state, upcard)] = CODE_VALUES[code]
+
+
+def basic_strategy(rules):
+    """Build a basic strategy table for the given rules."""
+    actions = bytearray(BUCKET_SIZE)
+    hard_h17 = HARD_H17 if rules.hits_soft_17 else {}
+    soft_h17 = SOFT_H17 if rules.hits_soft_17 else {}
+    pair_h17 = PAIR_H17 if rules.hits_soft_17 else {}
+
+    stand = ' '.join(['S'] * UPCARDS)
+    hit = ' '.join(['H'] * UPCARDS)
+    for total in range(4, 22):
+        row = HARD_CHART.get(total, hit if total < 9 else stand)
+        _fill_row(actions, hard_state(total), row, hard_h17, total)
+    for total in range(12, 22):
+        row = SOFT_CHART.get(total, hit if total < 13 else stand)
+        _fill_row(actions, soft_state(total), row, soft_h17, total)
+
+    for value in range(1, 11):
+        if value in PAIR_CHART:
+            _fill_row(
+                actions, pair_state(value), PAIR_CHART[value], pair_h17, value
+            )
+        else:
+            # Pairs that are never split play like their total
+            total = hand_state(2 * value, value == 1)
+            for upcard in range(1, 11):
+                actions[table_index(pair_state(value), upcard)] = actions[
+                    table_index(total, upcard)
+                ]
+
+    if not rules.surrender:
+        for i, code in enumerate(actions):
+            actions[i] = PLAIN_CODES.get(code, code)
+    return StrategyTable(actions)
+
+
+# Hi-Lo index plays as (state, upcard, index, code at or above the index,
+# code below the index). None keeps the basic strategy code. The indices
+# are the published ones, less the doubles against a ten or an Ace: the
+# dealer here does not check for blackjack, so a dealer 21 takes the
+# doubled wager and hitting stays better at every count. Stands on hands
+# that surrender keep surrendering first when it is allowed.
+DEVIATIONS = [
+    (hard_state(16), 10, 0, 'Rs', None),
+    (hard_state(15), 10, 4, 'Rs', None),
+    (pair_state(10), 5, 5, 'P', None),
+    (pair_state(10), 6, 4, 'P', None),
+    (hard_state(12), 3, 2, 'S', None),
+    (hard_state(12), 2, 3, 'S', None),
+    (hard_state(9), 2, 1, 'Dh', None),
+    (hard_state(9), 7, 3, 'Dh', None),
+    (hard_state(16), 9, 5, 'Rs', None),
+    (hard_state(13), 2, -1, None, 'H'),
+    (hard_state(12), 4, 0, None, 'H'),
+    (hard_state(12), 5, -2, None, 'H'),
+    (hard_state(12), 6, -1, None, 'H'),
+    (hard_state(13), 3, -2, None, 'H'),
+]
+
+
+def deviation_strategy(rules, min_bucket=-5, max_bucket=5):
+    """Basic strategy with Hi-Lo index plays, one bucket per true count."""
+    basic = basic_strategy(rules).actions
+    num_buckets = max_bucket - min_bucket + 1
+    actions = bytearray(basic * num_buckets)
+    for state, upcard, index, above, below in DEVIATIONS:
+        for bucket in range(num_buckets):
+            code = above if min_bucket + bucket >= index else below
+            if code is not None:
+                code = CODE_VALUES[code]
+                if not rules.surrender:
+                    code = PLAIN_CODES.get(code, code)
+                actions[table_index(state, upcard, bucket)] = code
+    return StrategyTable(actions, min_bucket, num_buckets)
@@ -0,0 +1,142 @@
+"""Sweep module. Evaluates house edge over grids of table rules."""
+
+
+import hashlib
+import json
+import os
+from itertools import product
+from collections import namedtuple
+
+from blackjackgame.miscellaneous import AtomicWrite
+from blackjackgame.rules import DEFAULT_RULES, cut_card_range, rules_to_dict
+from blackjackgame.simulation import simulate
+from blackjackgame.ev import ExactEV
+
+
+# Bump when a change to the engines invalidates cached results
+CACHE_VERSION = 1
+METHODS = ('simulate', 'exact')
+
+SweepPoint = namedtuple(
+    'SweepPoint', ['rules', 'method', 'house_edge', 'variance', 'rounds']
+)
+
+
+def grid(base=DEFAULT_RULES, **axes):
+    """Every combination of the given rule values, e.g. num_decks=[1, 8].
+
+    When the decks vary and the cut card range does not, the base range
+    is scaled to each shoe so that every point is dealt to the same
+    penetration, see rules.cut_card_range.
+    """
+    names = list(axes)
+    scaled = 'num_decks' in axes and not (
+        {'cut_card_min', 'cut_card_max'} & set(axes)
+    )
+    configs = []
+    for values in product(*(axes[name] for name in names)):
+        changes = dict(zip(names, values))
+        if scaled:
+            changes['cut_card_min'], changes['cut_card_max'] = (
+                cut_card_range(base, changes['num_decks'])
+            )
+        configs.append(base._replace(**changes))
+    return configs
+
+
+def cache_key(rules, method, rounds=0, seed=None):
+    """Content address of a grid point."""
+    if method == 'exact':
+        # Exact results depend on the rules alone
+        rounds, seed = 0, None
+    text = json.dumps(
+        {
+            'version': CACHE_VERSION,
+            'rules': rules_to_dict(rules),
+            'method': method,
+            'rounds': rounds,
+            'seed': seed,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Results stored on disk as one JSON file per content address."""
+
+    def __init__(self, directory='.sweep_cache'):
+        """Class constructor. Directory is created on first write."""
+        self._directory = directory
+
+    @property
+    def directory(self):
+        """Getter for cache directory."""
+        return self._directory
+
+    def path(self, key):
+        """File that holds the result for a key."""
+        return os.path.join(self._directory, key[:2], key + '.json')
+
+    def get(self, key):
+        """Cached result for a key, or None if it was never computed."""
+        try:
+            with open(self.path(key), 'r', encoding='utf-8') as file_handle:
+                return json.load(file_handle)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, result):
+        """Store a result. Written to a temporary file then renamed."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with AtomicWrite(path, 'w', 'utf-8') as file_handle:
+            json.dump(result, file_handle)
+
+
+def evaluate(rules, method='simulate', rounds=100000, seed=0):
+    """Compute house edge and variance per round for one set of rules."""
+    if method == 'simulate':
+        result = simulate(rules, rounds, seed)
+        return {
+            'house_edge': -result.mean,
+            'variance': result.variance,
+            'rounds': rounds,
+        }
+    if method == 'exact':
+        ev, variance = ExactEV(rules).round_ev()
+        return {'house_edge': -ev, 'variance': variance, 'rounds': 0}
+    raise ValueError(f"Unknown sweep method: {method}")
+
+
+def sweep(configs, method='simulate', rounds=100000, seed=0, cache=None):
+    """Evaluate every set of rules, computing only points not cached.
+
+    The same seed is used for every point so simulated configurations
+    are compared on the same shuffles. Simulations without a seed are
+    not reproducible, so they are neither cached nor read from cache.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown sweep method: {method}")
+    if cache is None:
+        cache = ResultCache()
+
+    cached = method == 'exact' or seed is not None
+    points = []
+    for rules in configs:
+        key = cache_key(rules, method, rounds, seed)
+        result = cache.get(key) if cached else None
+        if result is None:
+            result = evaluate(rules, method, rounds, seed)
+            if cached:
+                cache.put(key, result)
+        points.append(
+            SweepPoint(
+                rules,
+                method,
+                result['house_edge'],
+                result['variance'],
+                result['rounds'],
+            )
+        )
+    return points
@@ -0,0 +1,264 @@
+"""Tables module. Precomputed decision and EV tables mapped from disk.
+
+A table file holds a header, one byte per decision and five little-endian
+doubles per decision with the value of standing, hitting, doubling,
+splitting and surrendering. Files are mapped read-only so every process
+that loads the same file shares one copy of it in memory.
+"""
+
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from math import nan
+
+from blackjackgame.miscellaneous import AtomicWrite
+from blackjackgame.rules import DEFAULT_RULES, rule_hash
+from blackjackgame.ev import ExactEV, shoe_counts
+from blackjackgame.strategy import (
+    StrategyTable, CODE_VALUES, BUCKET_SIZE, NUM_STATES, UPCARDS,
+    STAND, HIT, DOUBLE, SPLIT, SURRENDER,
+    soft_state, pair_state, table_index,
+)
+
+
+MAGIC = b'BJTB'
+VERSION = 1
+NUM_ACTIONS = 5
+# Magic, version, states, upcards, actions, first bucket, bucket count,
+# decision offset, EV offset, rule digest
+HEADER = struct.Struct('<4sHHHHhHII32s')
+
+_loaded = {}
+
+
+def rule_digest(rules):
+    """Raw digest of a rule set, stored in table headers."""
+    return bytes.fromhex(rule_hash(rules))
+
+
+def true_count_counts(num_decks, true_count):
+    """Shoe composition halfway through the shoe at a Hi-Lo true count."""
+    decks = max(1, num_decks // 2)
+    counts = shoe_counts(decks)
+    running = true_count * decks
+    if running > 0:
+        # Low cards 2-6 have been dealt
+        order = [1, 2, 3, 4, 5]
+    else:
+        # Tens and Aces have been dealt, four tens to every Ace
+        order = [9, 9, 9, 9, 0]
+    for i in range(abs(running)):
+        counts[order[i % len(order)]] -= 1
+    return counts
+
+
+def representative_hand(state):
+    """Cards that make up a typical hand for a state, and its pair value."""
+    pairs = pair_state(1)
+    if state >= pairs:
+        value = state - pairs + 1
+        return [value, value], value
+    soft = soft_state(12)
+    if state >= soft:
+        total = state - soft + 12
+        return ([1, total - 11] if total < 21 else [1, 5, 5]), 0
+    total = state + 4
+    if total <= 12:
+        return [2, total - 2], 0
+    if total <= 20:
+        return [10, total - 10], 0
+    return [10, 9, 2], 0
+
+
+def decision_code(values):
+    """Table code for the action with the highest expected value."""
+    best = max(values, key=lambda action: values[action][0])
+    plain = 'S' if values[STAND][0] >= values[HIT][0] else 'H'
+    if best == DOUBLE:
+        return 'D' + plain.lower()
+    if best == SURRENDER:
+        others = [action for action in values if action != SURRENDER]
+        second = max(others, key=lambda action: values[action][0])
+        if second == SPLIT:
+            return 'Rp'
+        return 'R' + plain.lower()
+    if best == SPLIT:
+        return 'P'
+    return plain
+
+
+def table_column(calculator, upcard):
+    """Decision code and action values of every hand state for an upcard."""
+    column = []
+    for state in range(NUM_STATES):
+        cards, pair = representative_hand(state)
+        counts = list(calculator.counts)
+        for value in cards + [upcard]:
+            counts[value - 1] -= 1
+        values = calculator.hand_actions(
+            counts, sum(cards), 1 in cards, upcard, pair
+        )
+        column.append(
+            (
+                CODE_VALUES[decision_code(values)],
+                {action: value[0] for action, value in values.items()},
+            )
+        )
+    return column
+
+
+def fill_column(actions, evs, bucket, upcard, column):
+    """Copy a column computed by table_column into the flat tables."""
+    for state, (code, values) in enumerate(column):
+        index = table_index(state, upcard, bucket)
+        actions[index] = code
+        for action, value in values.items():
+            evs[index * NUM_ACTIONS + action] = value
+
+
+def empty_tables(num_buckets):
+    """Flat decision and EV tables with every value missing."""
+    actions = bytearray(num_buckets * BUCKET_SIZE)
+    return actions, [nan] * (len(actions) * NUM_ACTIONS)
+
+
+def compute_tables(rules=DEFAULT_RULES, buckets=range(-5, 6), processes=1):
+    """Compute decisions and expected values for each true count bucket.
+
+    More than one process hands the work to a process pool, see the
+    parallel module.
+    """
+    buckets = list(buckets)
+    if processes != 1:
+        from blackjackgame.parallel import parallel_tables
+
+        return parallel_tables(rules, buckets, processes)
+
+    actions, evs = empty_tables(len(buckets))
+    for bucket, true_count in enumerate(buckets):
+        calculator = ExactEV(
+            rules, true_count_counts(rules.num_decks, true_count)
+        )
+        for upcard in range(1, 11):
+            column = table_column(calculator, upcard)
+            fill_column(actions, evs, bucket, upcard, column)
+    return actions, evs, buckets[0]
+
+
+def write_tables(path, rules=DEFAULT_RULES, buckets=range(-5, 6), processes=1):
+    """Compute tables and write them to a file."""
+    actions, evs, min_bucket = compute_tables(rules, buckets, processes)
+    ev_offset = HEADER.size + len(actions)
+    ev_offset += -ev_offset % 8
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        NUM_STATES,
+        UPCARDS,
+        NUM_ACTIONS,
+        min_bucket,
+        len(actions) // BUCKET_SIZE,
+        HEADER.size,
+        ev_offset,
+        rule_digest(rules),
+    )
+
+    with AtomicWrite(path) as file_handle:
+        file_handle.write(header)
+        file_handle.write(actions)
+        file_handle.write(bytes(ev_offset - HEADER.size - len(actions)))
+        file_handle.write(struct.pack(f'<{len(evs)}d', *evs))
+
+
+class PrecomputedTables:
+    """Read-only view of a table file mapped into memory."""
+
+    def __init__(self, path, rules=None):
+        """Class constructor. Maps the file and checks its header."""
+        with open(path, 'rb') as file_handle:
+            self._mmap = mmap.mmap(
+                file_handle.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"{path} is not a decision table.")
+        (
+            magic,
+            version,
+            num_states,
+            upcards,
+            num_actions,
+            min_bucket,
+            num_buckets,
+            actions_offset,
+            ev_offset,
+            digest,
+        ) = HEADER.unpack_from(self._mmap)
+
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a decision table.")
+        if version != VERSION:
+            raise ValueError(
+                f"{path} has table format version {version}, "
+                f"expected {VERSION}."
+            )
+        if (num_states, upcards, num_actions) != (
+            NUM_STATES, UPCARDS, NUM_ACTIONS
+        ):
+            raise ValueError(f"{path} has an unexpected table layout.")
+        self._path = path
+        self._digest = digest
+        self.check_rules(rules)
+
+        size = num_buckets * BUCKET_SIZE
+        end = ev_offset + size * NUM_ACTIONS * 8
+        if (
+            min(actions_offset, ev_offset) < HEADER.size
+            or actions_offset + size > len(self._mmap)
+            or end > len(self._mmap)
+        ):
+            raise ValueError(f"{path} is truncated or damaged.")
+        view = memoryview(self._mmap)
+        self._strategy = StrategyTable(
+            view[actions_offset : actions_offset + size],
+            min_bucket,
+            num_buckets,
+        )
+        if sys.byteorder == 'little':
+            self._evs = view[ev_offset:end].cast('d')
+        else:
+            # Big-endian hosts cannot use the file's doubles in place
+            self._evs = array('d')
+            self._evs.frombytes(view[ev_offset:end])
+            self._evs.byteswap()
+
+    def check_rules(self, rules):
+        """Raise an error if the tables were computed for other rules."""
+        if rules is not None and self._digest != rule_digest(rules):
+            raise ValueError(
+                f"{self._path} was computed for different rules."
+            )
+
+    @property
+    def strategy(self):
+        """Getter for the decision table."""
+        return self._strategy
+
+    def ev(self, state, upcard, action, true_count=0):
+        """Expected value of an action, or nan if it is not available."""
+        bucket = self._strategy.bucket(true_count)
+        return self._evs[
+            table_index(state, upcard, bucket) * NUM_ACTIONS + action
+        ]
+
+
+def load_tables(path, rules=None):
+    """Tables for a file, mapped once per process on first use."""
+    key = os.path.realpath(path)
+    if key not in _loaded:
+        _loaded[key] = PrecomputedTables(path, rules)
+    else:
+        _loaded[key].check_rules(rules)
+    return _loaded[key]
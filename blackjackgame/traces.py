@@ -0,0 +1,101 @@
+"""Traces module. Fixed shoe orders recorded, generated and streamed.
+
+A trace is a shoe given as a bytes object of card codes. A trace file
+holds a header followed by one length prefixed trace after another, so
+traces can be read one at a time no matter how large the file is.
+"""
+
+
+import struct
+from random import Random
+
+from blackjackgame.cards import CARDS, CODE_VALUES, card_code
+from blackjackgame.miscellaneous import AtomicWrite
+
+
+MAGIC = b'BJTR'
+VERSION = 1
+HEADER = struct.Struct('<4sH')
+LENGTH = struct.Struct('<H')
+
+
+def record_deck(deck):
+    """Trace of the cards left in a deck, in the order they will be dealt."""
+    return bytes(map(card_code, deck.cards))
+
+
+def trace_values(codes):
+    """Blackjack values of the cards in a trace."""
+    values = bytes(codes).translate(CODE_VALUES)
+    # Codes past the last card translate to 0
+    if 0 in values:
+        raise ValueError(f"Trace holds a card code above {len(CARDS) - 1}.")
+    return values
+
+
+def write_traces(path, traces):
+    """Write traces to a file. Traces may be any iterable, even a generator."""
+    with AtomicWrite(path) as file_handle:
+        file_handle.write(HEADER.pack(MAGIC, VERSION))
+        for codes in traces:
+            file_handle.write(LENGTH.pack(len(codes)))
+            file_handle.write(codes)
+
+
+def read_traces(path):
+    """Yield the traces in a file one at a time."""
+    with open(path, 'rb') as file_handle:
+        header = file_handle.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is not a trace file.")
+        magic, version = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a trace file.")
+        if version != VERSION:
+            raise ValueError(
+                f"{path} has trace format version {version}, "
+                f"expected {VERSION}."
+            )
+
+        while True:
+            prefix = file_handle.read(LENGTH.size)
+            if not prefix:
+                return
+            if len(prefix) < LENGTH.size:
+                raise ValueError(f"{path} ends in the middle of a trace.")
+            (length,) = LENGTH.unpack(prefix)
+            codes = file_handle.read(length)
+            if len(codes) < length:
+                raise ValueError(f"{path} ends in the middle of a trace.")
+            if max(codes, default=0) >= len(CARDS):
+                raise ValueError(
+                    f"{path} holds a card code above {len(CARDS) - 1}."
+                )
+            yield codes
+
+
+def random_orders(count, num_decks=8, seed=None):
+    """Yield shuffled shoes, reproducible from the seed."""
+    rng = Random(seed)
+    shoe = bytearray(range(len(CARDS))) * num_decks
+    for _ in range(count):
+        rng.shuffle(shoe)
+        yield bytes(shoe)
+
+
+def clumped_orders(count, num_decks=8, seed=None, clump=26):
+    """Yield shuffled shoes with each run of cards sorted by value.
+
+    Runs of equal values are far more common than in a fair shuffle,
+    which makes these shoes useful for stressing strategies.
+    """
+    for codes in random_orders(count, num_decks, seed):
+        shoe = bytearray()
+        for start in range(0, len(codes), clump):
+            shoe += bytes(
+                sorted(
+                    codes[start : start + clump],
+                    key=CODE_VALUES.__getitem__,
+                )
+            )
+        yield bytes(shoe)